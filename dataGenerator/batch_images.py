@@ -0,0 +1,361 @@
+"""Asynchronous Batch API mode for bulk image generation (``--batch-mode``).
+
+Instead of one synchronous ``images.generate`` call per item, requests are
+written to JSONL files under ``<output_dir>/batch/``, uploaded and submitted as
+batch jobs, then polled until completion. Each finished job is streamed into
+``images/`` immediately, so results land while other jobs are still running.
+
+Job IDs are checkpointed in ``<output_dir>/batch/jobs.json`` right after
+submission. A restarted run re-attaches to unfinished jobs instead of paying for
+the same images twice; items whose job failed or expired are resubmitted.
+
+``FakeBatchClient`` implements the small subset of the OpenAI client used here
+(``files.create/content``, ``batches.create/retrieve``) on the local filesystem,
+so the whole flow, including restarts, can be exercised without network access.
+"""
+
+from __future__ import annotations
+
+import base64
+import json
+import logging
+import os
+import struct
+import time
+import uuid
+import zlib
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Set, Tuple
+
+if TYPE_CHECKING:
+    from models import CatalogItem, Config
+    from progress import ProgressTracker
+
+TERMINAL_STATUSES = {"completed", "failed", "expired", "cancelled"}
+
+
+# ----------------------------- Checkpoint Store ---------------------------- #
+
+
+class BatchJobStore:
+    """Persistent list of submitted batch jobs (``batch/jobs.json``).
+
+    Each job: ``{"id", "inputFile", "productIds", "promptHashes", "status", "processed"}``;
+    ``promptHashes`` maps productId -> hash of the prompt actually submitted.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.jobs: List[dict] = json.loads(path.read_text()) if path.exists() else []
+
+    def save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        tmp.write_text(json.dumps(self.jobs, indent=2))
+        os.replace(tmp, self.path)
+
+    def pending(self) -> List[dict]:
+        """Jobs whose results have not been written to disk yet."""
+        return [j for j in self.jobs if not j["processed"]]
+
+    def pending_ids(self) -> Set[str]:
+        return {pid for j in self.pending() for pid in j["productIds"]}
+
+    def add(self, job_id: str, input_file: Path, prompt_hashes: Dict[str, str]) -> None:
+        self.jobs.append(
+            {
+                "id": job_id,
+                "inputFile": input_file.name,
+                "productIds": list(prompt_hashes),
+                "promptHashes": prompt_hashes,
+                "status": "submitted",
+                "processed": False,
+            }
+        )
+        self.save()
+
+    def invalidate(self, product_ids: Set[str]) -> None:
+        """Stop waiting for ``product_ids`` in pending jobs; their results will be ignored."""
+        for job in self.pending():
+            if product_ids & set(job["productIds"]):
+                job["productIds"] = [pid for pid in job["productIds"] if pid not in product_ids]
+                job["promptHashes"] = {pid: h for pid, h in job["promptHashes"].items() if pid not in product_ids}
+        self.save()
+
+
+# ----------------------------- Request / Result I/O ------------------------ #
+
+
+def build_request_lines(items: List[CatalogItem], cfg: Config) -> List[dict]:
+    """One batch request line per item, keyed by productId (``custom_id``)."""
+    model_for_image = cfg.image_deployment or cfg.gpt_deployment
+    return [
+        {
+            "custom_id": str(item.productId),
+            "method": "POST",
+            "url": cfg.batch_endpoint,
+            "body": {
+                "model": model_for_image,
+                "prompt": item.imagePrompt,
+                "size": f"{cfg.image_size}x{cfg.image_size}",
+                "n": 1,
+            },
+        }
+        for item in items
+    ]
+
+
+def write_request_file(lines: List[dict], batch_dir: Path) -> Path:
+    batch_dir.mkdir(parents=True, exist_ok=True)
+    path = batch_dir / f"requests-{uuid.uuid4().hex[:12]}.jsonl"
+    path.write_text("".join(json.dumps(line) + "\n" for line in lines))
+    return path
+
+
+def _write_results(output_text: str, items_by_id: Dict[str, CatalogItem], submitted: Dict[str, str], images_dir: Path) -> List[str]:
+    """Decode result lines into image files; returns productIds written.
+
+    Only productIds in ``submitted`` (productId -> hash of the prompt sent) are
+    accepted, and that hash, not the current catalog prompt's, is recorded as the
+    item's ``promptHash``, so an image rendered from an outdated prompt stays stale.
+    """
+    written: List[str] = []
+    for raw in output_text.splitlines():
+        if not raw.strip():
+            continue
+        line = json.loads(raw)
+        pid = line.get("custom_id")
+        if pid not in items_by_id or pid not in submitted:
+            logging.debug("Ignoring batch result for %s (no longer in catalog or invalidated)", pid)
+            continue
+        response = line.get("response") or {}
+        data = (response.get("body") or {}).get("data") or []
+        if line.get("error") or response.get("status_code") != 200 or not data:
+            logging.error("Batch image failed for %s: %s", pid, line.get("error") or response.get("body"))
+            continue
+        item = items_by_id[pid]
+        path = images_dir / item.filename
+        tmp = path.with_suffix(".tmp")
+        tmp.write_bytes(base64.b64decode(data[0]["b64_json"]))
+        tmp.replace(path)
+        item.promptHash = submitted[pid]
+        written.append(pid)
+    return written
+
+
+def _log_job_errors(client, job: dict, batch) -> None:
+    """Log why a job (or some of its requests) failed: job-level errors plus the error file."""
+    errors = getattr(batch, "errors", None)
+    job_errors = [f"{e.code}: {e.message}" for e in (getattr(errors, "data", None) or [])]
+    error_file_id = getattr(batch, "error_file_id", None)
+    level = logging.ERROR if batch.status == "failed" else logging.WARNING
+    logging.log(level, "Batch %s ended %s (error_file_id=%s)%s", job["id"], batch.status, error_file_id, f": {'; '.join(job_errors)}" if job_errors else "")
+    if error_file_id:
+        for raw in client.files.content(error_file_id).text.splitlines():
+            if raw.strip():
+                line = json.loads(raw)
+                logging.error("Batch image failed for %s: %s", line.get("custom_id"), line.get("error") or (line.get("response") or {}).get("body"))
+
+
+# ----------------------------- Batch Driver -------------------------------- #
+
+
+def submit_batches(client, cfg: Config, items: List[CatalogItem], store: BatchJobStore, batch_dir: Path) -> int:
+    """Write request files for ``items`` in chunks, submit them and checkpoint job IDs."""
+    from models import prompt_hash
+
+    submitted = 0
+    for start in range(0, len(items), cfg.batch_max_requests):
+        chunk = items[start : start + cfg.batch_max_requests]
+        request_file = write_request_file(build_request_lines(chunk, cfg), batch_dir)
+        with request_file.open("rb") as f:
+            uploaded = client.files.create(file=f, purpose="batch")
+        job = client.batches.create(input_file_id=uploaded.id, endpoint=cfg.batch_endpoint, completion_window="24h")
+        store.add(job.id, request_file, {str(i.productId): prompt_hash(i.imagePrompt, cfg.image_size) for i in chunk})
+        submitted += len(chunk)
+        logging.info("Submitted batch %s with %d image requests", job.id, len(chunk))
+    return submitted
+
+
+def collect_batches(
+    client,
+    cfg: Config,
+    items: List[CatalogItem],
+    store: BatchJobStore,
+    images_dir: Path,
+    progress: Optional[ProgressTracker] = None,
+    persist: Optional[Callable[[], None]] = None,
+) -> List[str]:
+    """Poll pending jobs until all reach a terminal status, writing results as each finishes.
+
+    ``persist`` (e.g. saving the catalog) runs after a job's images are written and before
+    the job is checkpointed as processed, so a restart never loses their ``promptHash``
+    values; at worst an already written job is decoded again, at no extra cost.
+    """
+    items_by_id = {str(i.productId): i for i in items}
+    written: List[str] = []
+    while store.pending():
+        for job in store.pending():
+            batch = client.batches.retrieve(job["id"])
+            job["status"] = batch.status
+            if batch.status not in TERMINAL_STATUSES:
+                continue
+            if batch.status != "completed" or getattr(batch, "error_file_id", None):
+                _log_job_errors(client, job, batch)
+            job_written: List[str] = []
+            # Expired / cancelled jobs may still carry partial output.
+            if getattr(batch, "output_file_id", None):
+                output_text = client.files.content(batch.output_file_id).text
+                job_written = _write_results(output_text, items_by_id, job["promptHashes"], images_dir)
+            if job_written and persist:
+                persist()
+            job["processed"] = True
+            store.save()
+            written.extend(job_written)
+            if progress:
+                progress.finish("images", n=len(job_written), failed=len(job["productIds"]) - len(job_written))
+            logging.info("Batch %s %s: %d/%d images written", job["id"], batch.status, len(job_written), len(job["productIds"]))
+        store.save()
+        if store.pending():
+            time.sleep(cfg.batch_poll_seconds)
+    return written
+
+
+def generate_images_batch(
+    client,
+    cfg: Config,
+    items: List[CatalogItem],
+    force: bool,
+    progress: Optional[ProgressTracker] = None,
+    persist: Optional[Callable[[], None]] = None,
+) -> List[str]:
+    """Batch-mode counterpart of ``main.generate_images``; returns productIds whose image was written.
+
+    ``persist`` is called after each finished job that wrote images (see :func:`collect_batches`).
+
+    Items already covered by an unfinished checkpointed job are not resubmitted,
+    even with ``force``, to avoid paying for the same image twice, unless their
+    prompt changed since submission: those are invalidated in the old job and
+    submitted again.
+    """
+    from models import prompt_hash
+
+    if cfg.dry_run:
+        logging.info("DRY_RUN=true -> skipping image generation")
+        return []
+    images_dir = cfg.output_dir / "images"
+    images_dir.mkdir(parents=True, exist_ok=True)
+    batch_dir = cfg.output_dir / "batch"
+    store = BatchJobStore(batch_dir / "jobs.json")
+    current = {str(i.productId): prompt_hash(i.imagePrompt, cfg.image_size) for i in items}
+    changed = {
+        pid
+        for job in store.pending()
+        for pid, submitted in job["promptHashes"].items()
+        if pid in current and current[pid] != submitted
+    }
+    if changed:
+        logging.info("Resubmitting %d in-flight images whose prompt changed since submission", len(changed))
+        store.invalidate(changed)
+    in_flight = store.pending_ids()
+    if in_flight:
+        logging.info("Resuming %d unfinished batch jobs (%d images)", len(store.pending()), len(in_flight))
+    todo = [
+        i for i in items
+        if str(i.productId) in changed
+        or (str(i.productId) not in in_flight and i.needs_image(images_dir, cfg.image_size, force))
+    ]
+    submit_batches(client, cfg, todo, store, batch_dir)
+    if progress:
+        progress.stage("images", total=len(store.pending_ids()))
+        progress.start("images", len(store.pending_ids()))
+    return collect_batches(client, cfg, items, store, images_dir, progress, persist)
+
+
+# ----------------------------- Local Fake Service -------------------------- #
+
+
+def tiny_png(rgb: tuple = (200, 40, 40)) -> bytes:
+    """A valid 1x1 PNG, used as the fake service's image payload."""
+
+    def chunk(tag: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data) & 0xFFFFFFFF)
+
+    raw = b"\x00" + bytes(rgb)
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", struct.pack(">IIBBBBB", 1, 1, 8, 2, 0, 0, 0))
+        + chunk(b"IDAT", zlib.compress(raw))
+        + chunk(b"IEND", b"")
+    )
+
+
+class _Obj:
+    def __init__(self, **kw):
+        self.__dict__.update(kw)
+
+
+class FakeBatchClient:
+    """Filesystem-backed stand-in for the OpenAI Files + Batches API.
+
+    State lives under ``root`` so a new instance (e.g. after a simulated restart)
+    sees jobs submitted by a previous one. A batch completes after
+    ``polls_to_complete`` ``retrieve`` calls; prompts containing ``fail_marker``
+    produce an error line instead of an image.
+    """
+
+    def __init__(self, root: Path, polls_to_complete: int = 1, fail_marker: str = "FAIL"):
+        self.root = Path(root)
+        (self.root / "files").mkdir(parents=True, exist_ok=True)
+        (self.root / "batches").mkdir(parents=True, exist_ok=True)
+        self.polls_to_complete = polls_to_complete
+        self.fail_marker = fail_marker
+        self.files = _Obj(create=self._file_create, content=self._file_content)
+        self.batches = _Obj(create=self._batch_create, retrieve=self._batch_retrieve)
+
+    def _file_create(self, file, purpose: str):
+        file_id = f"file-{uuid.uuid4().hex[:12]}"
+        (self.root / "files" / file_id).write_bytes(file.read())
+        return _Obj(id=file_id, purpose=purpose)
+
+    def _file_content(self, file_id: str):
+        return _Obj(text=(self.root / "files" / file_id).read_text())
+
+    def _batch_path(self, batch_id: str) -> Path:
+        return self.root / "batches" / f"{batch_id}.json"
+
+    def _batch_create(self, input_file_id: str, endpoint: str, completion_window: str):
+        batch_id = f"batch-{uuid.uuid4().hex[:12]}"
+        state = {"id": batch_id, "input_file_id": input_file_id, "endpoint": endpoint, "status": "in_progress", "polls": 0, "output_file_id": None, "error_file_id": None}
+        self._batch_path(batch_id).write_text(json.dumps(state))
+        return _Obj(**state)
+
+    def _batch_retrieve(self, batch_id: str):
+        state = json.loads(self._batch_path(batch_id).read_text())
+        if state["status"] == "in_progress":
+            state["polls"] += 1
+            if state["polls"] >= self.polls_to_complete:
+                state["output_file_id"], state["error_file_id"] = self._run(state["input_file_id"])
+                state["status"] = "completed"
+            self._batch_path(batch_id).write_text(json.dumps(state))
+        return _Obj(**state)
+
+    def _write_file(self, lines: List[dict]) -> Optional[str]:
+        if not lines:
+            return None
+        file_id = f"file-{uuid.uuid4().hex[:12]}"
+        (self.root / "files" / file_id).write_text("".join(json.dumps(line) + "\n" for line in lines))
+        return file_id
+
+    def _run(self, input_file_id: str) -> Tuple[Optional[str], Optional[str]]:
+        """Produce (output_file_id, error_file_id); like the real service, failed requests go to the error file."""
+        out_lines, error_lines = [], []
+        image_b64 = base64.b64encode(tiny_png()).decode()
+        for raw in self._file_content(input_file_id).text.splitlines():
+            req = json.loads(raw)
+            if self.fail_marker and self.fail_marker in req["body"]["prompt"]:
+                error_lines.append({"custom_id": req["custom_id"], "response": None, "error": {"code": "fake_error", "message": "forced failure"}})
+            else:
+                body = {"data": [{"b64_json": image_b64}]}
+                out_lines.append({"custom_id": req["custom_id"], "response": {"status_code": 200, "body": body}, "error": None})
+        return self._write_file(out_lines), self._write_file(error_lines)
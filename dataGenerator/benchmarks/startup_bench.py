@@ -0,0 +1,89 @@
+"""Startup benchmark for the data generator CLI entry points.
+
+Runs each quick command several times with ``python -X importtime`` and reports
+wall-clock time, total import time and whether any heavy module (openai,
+pydantic, tqdm, asyncio) was imported. Quick paths must stay free of those.
+
+Usage (from dataGenerator directory):
+  uv run python benchmarks/startup_bench.py
+  uv run python benchmarks/startup_bench.py --runs 10 --max-ms 150
+
+The script exits with code 1 if any command exits non-zero (a crash is not a
+fast startup), and with --max-ms also if a median wall time exceeds the budget
+or a heavy module shows up on a quick path.
+"""
+from __future__ import annotations
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import List, Set, Tuple
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+HEAVY_MODULES = ("openai", "pydantic", "tqdm", "asyncio")
+COMMANDS = [
+    ["main.py", "--help"],
+    ["main.py", "--status"],
+    ["prune_missing_images.py", "--check"],
+]
+
+
+def parse_importtime(stderr: str) -> Tuple[float, Set[str]]:
+    """Return (sum of top-level cumulative import time in ms, top-level package names)."""
+    total_us = 0
+    modules: Set[str] = set()
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        modules.add(name.strip().split(".")[0])
+        # Nested imports are indented by two extra spaces per level; only sum top level.
+        if not name.startswith("  "):
+            total_us += int(cumulative)
+    return total_us / 1000, modules
+
+
+def run_once(command: List[str]) -> Tuple[float, float, Set[str], int]:
+    """Run one command; return (wall ms, import ms, imported top-level modules, exit code)."""
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", *command],
+        cwd=PROJECT_DIR,
+        capture_output=True,
+        text=True,
+    )
+    wall_ms = (time.perf_counter() - start) * 1000
+    import_ms, modules = parse_importtime(proc.stderr)
+    if proc.returncode != 0:
+        errors = [line for line in proc.stderr.splitlines() if not line.startswith("import time:")]
+        print(f"  {' '.join(command)} exited with {proc.returncode}: {errors[-1] if errors else ''}", file=sys.stderr)
+    return wall_ms, import_ms, modules, proc.returncode
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure startup time of quick data generator commands.")
+    parser.add_argument("--runs", type=int, default=5, help="Runs per command (median reported).")
+    parser.add_argument("--max-ms", type=float, help="Fail if a median wall time exceeds this budget.")
+    args = parser.parse_args()
+
+    baseline = statistics.median(run_once(["-c", "pass"])[0] for _ in range(args.runs))
+    print(f"Interpreter baseline (python -c pass): {baseline:.1f} ms")
+    failed = False
+    for command in COMMANDS:
+        results = [run_once(command) for _ in range(args.runs)]
+        wall = statistics.median(r[0] for r in results)
+        imports = statistics.median(r[1] for r in results)
+        heavy = sorted(set().union(*(r[2] for r in results)) & set(HEAVY_MODULES))
+        crashed = any(r[3] != 0 for r in results)
+        status = " | FAILED (non-zero exit)" if crashed else ""
+        print(f"{' '.join(command):40s} wall {wall:7.1f} ms | imports {imports:7.1f} ms | heavy: {', '.join(heavy) or 'none'}{status}")
+        if crashed or (args.max_ms is not None and (heavy or wall > args.max_ms)):
+            failed = True
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
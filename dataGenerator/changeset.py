@@ -0,0 +1,135 @@
+"""Versioned catalog changesets between generator runs.
+
+Each run (and ``prune_missing_images.py --prune``) compares the catalog it
+started from with the catalog it produced and writes
+``changesets/changeset-<version>.json``:
+
+```json
+{
+  "schemaVersion": 1,
+  "version": 3,
+  "createdAt": "2026-01-01T00:00:00+00:00",
+  "source": "generator",
+  "baseDigest": "<sha256 of previous catalog>",
+  "targetDigest": "<sha256 of resulting catalog>",
+  "counts": {"added": 1, "removed": 1, "modified": 0, "images": 1},
+  "added": [{...catalog item...}],
+  "removed": [{"productId": "...", "filename": "..."}],
+  "modified": [{...catalog item after change...}],
+  "images": {"<productId>": "<sha256 of PNG or null if missing>"}
+}
+```
+
+Importers apply changesets in ``version`` order; ``baseDigest`` must match the
+digest of the catalog they currently hold, otherwise they fall back to a full
+import. Rows are compared and digested without generator-internal fields
+(``promptHash``). Only the standard library is used.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+SCHEMA_VERSION = 1
+_FILE_RE = re.compile(r"^changeset-(\d+)\.json$")
+# Generator bookkeeping (not catalog content): ignored when diffing rows and computing digests, so
+# e.g. legacy entries adopting a promptHash do not show up as modified. Rewritten images are
+# reported through ``touched_ids`` instead.
+INTERNAL_FIELDS = frozenset({"promptHash"})
+
+
+def _content(row: dict) -> dict:
+    return {k: v for k, v in row.items() if k not in INTERNAL_FIELDS}
+
+
+def catalog_digest(rows: List[dict]) -> str:
+    """SHA-256 of the canonical JSON form of a catalog's content (independent of key and row order)."""
+    ordered = sorted((_content(r) for r in rows), key=lambda r: r.get("productId", ""))
+    canonical = json.dumps(ordered, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def file_digest(path: Path) -> Optional[str]:
+    """SHA-256 hex digest of a file, or ``None`` if it does not exist."""
+    if not path.exists():
+        return None
+    h = hashlib.sha256()
+    with path.open("rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def build_changeset(
+    previous: List[dict],
+    current: List[dict],
+    images_dir: Path,
+    touched_ids: Iterable[str] = (),
+    source: str = "generator",
+) -> dict:
+    """Compute the delta from ``previous`` to ``current`` catalog rows.
+
+    Args:
+        previous: Catalog rows the run started from.
+        current: Catalog rows after the run.
+        images_dir: Directory holding ``<filename>`` images, used for digests.
+        touched_ids: Extra productIds whose image was rewritten without a row change.
+        source: Free-form producer label (``generator``, ``prune``, ...).
+
+    Returns:
+        Changeset dict without ``version`` (assigned by :func:`write_changeset`).
+    """
+    prev: Dict[str, dict] = {r["productId"]: r for r in previous}
+    cur: Dict[str, dict] = {r["productId"]: r for r in current}
+    added = [row for pid, row in cur.items() if pid not in prev]
+    removed = [{"productId": pid, "filename": row.get("filename")} for pid, row in prev.items() if pid not in cur]
+    modified = [row for pid, row in cur.items() if pid in prev and _content(prev[pid]) != _content(row)]
+    image_ids = [r["productId"] for r in added + modified]
+    image_ids += [pid for pid in touched_ids if pid in cur and pid not in image_ids]
+    images = {pid: file_digest(images_dir / cur[pid]["filename"]) for pid in image_ids}
+    return {
+        "schemaVersion": SCHEMA_VERSION,
+        "createdAt": datetime.now(timezone.utc).isoformat(),
+        "source": source,
+        "baseDigest": catalog_digest(previous),
+        "targetDigest": catalog_digest(current),
+        "counts": {"added": len(added), "removed": len(removed), "modified": len(modified), "images": len(images)},
+        "added": added,
+        "removed": removed,
+        "modified": modified,
+        "images": images,
+    }
+
+
+def is_empty(changeset: dict) -> bool:
+    """True when the changeset carries no row or image changes."""
+    return not any(changeset["counts"].values())
+
+
+def next_version(changes_dir: Path) -> int:
+    """Next sequential changeset version in ``changes_dir`` (1 if none yet)."""
+    versions = [int(m.group(1)) for p in changes_dir.glob("changeset-*.json") if (m := _FILE_RE.match(p.name))]
+    return max(versions, default=0) + 1
+
+
+def write_changeset(changeset: dict, changes_dir: Path) -> Optional[Path]:
+    """Assign the next version and atomically write the changeset; skips empty ones.
+
+    Returns:
+        Path of the written file, or ``None`` if there was nothing to record.
+    """
+    if is_empty(changeset):
+        return None
+    changes_dir.mkdir(parents=True, exist_ok=True)
+    version = next_version(changes_dir)
+    out = changes_dir / f"changeset-{version:06d}.json"
+    tmp = out.with_name(out.name + ".tmp")
+    tmp.write_text(json.dumps({"version": version, **changeset}, indent=2), encoding="utf-8")
+    os.replace(tmp, out)
+    return out
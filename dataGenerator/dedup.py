@@ -0,0 +1,210 @@
+"""Local near-duplicate index for generated catalog items.
+
+Exact name matching lets through items such as "Comet Trail Navigator" vs
+"Comet Trail Navigators" or lightly reworded descriptions, each of which then
+costs a full image generation. This module keeps a MinHash/LSH index over
+item names and over description + imagePrompt content so candidates are
+rejected before any image is requested.
+
+Names (character 3-grams) and content (distinct words without stop words) use
+separate thresholds: a paraphrase keeps most of its vocabulary but little of its
+word order, so content similarity of real duplicates is much lower than that
+of renamed items.
+
+Lookups only compare against items sharing at least one LSH bucket, so cost
+stays roughly constant as the catalog grows into tens of thousands of items.
+MinHash signatures are computed with NumPy (one vectorized pass per item).
+"""
+
+from __future__ import annotations
+
+import random
+import re
+import zlib
+from typing import Dict, Iterable, List, Optional, Sequence, Set
+
+import numpy as np
+
+# Largest prime below 2**32: with 32-bit multipliers, a * h + b stays within uint64.
+_PRIME = 4294967291
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+# Every imagePrompt shares the mandated opening and stylistic tail; leaving them in
+# would make all prompts look alike.
+_PROMPT_BOILERPLATE = (
+    "photorealistic lego-style minifigure",
+    "photorealistic lego-style figure",
+    "clean background, high detail, vibrant, evenly lit, 1024x1024",
+)
+_STOP_WORDS = frozenset(
+    "a an the and or of in on with to for from by at as is are that this it its their they them "
+    "his her be into over through while set".split()
+)
+
+def normalize_tokens(text: str) -> List[str]:
+    """Lowercase, strip punctuation and naively singularize tokens of ``text``."""
+    tokens = []
+    for tok in _TOKEN_RE.findall(text.lower()):
+        if len(tok) > 3 and tok.endswith("s") and not tok.endswith("ss"):
+            tok = tok[:-1]
+        tokens.append(tok)
+    return tokens
+
+
+def _strip_prompt_boilerplate(prompt: str) -> str:
+    low = prompt.lower()
+    for phrase in _PROMPT_BOILERPLATE:
+        low = low.replace(phrase, " ")
+    return low
+
+
+def name_shingles(name: str, k: int = 3) -> Set[str]:
+    """Character k-grams of the normalized name (robust to plurals / small edits)."""
+    text = " ".join(normalize_tokens(name))
+    if len(text) <= k:
+        return {text}
+    return {text[i : i + k] for i in range(len(text) - k + 1)}
+
+
+def content_shingles(description: str, image_prompt: str) -> Set[str]:
+    """Distinct non-stop words of description plus the distinctive part of imagePrompt."""
+    tokens = normalize_tokens(description) + normalize_tokens(_strip_prompt_boilerplate(image_prompt))
+    return {tok for tok in tokens if tok not in _STOP_WORDS} or {""}
+
+
+def jaccard(a: Set[str], b: Set[str]) -> float:
+    """Exact Jaccard similarity of two shingle sets."""
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+class _LSHTable:
+    """MinHash signatures bucketed into bands; returns candidate keys for a shingle set."""
+
+    def __init__(self, num_perm: int, bands: int, seed: int):
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        rng = random.Random(seed)
+        self._a = np.array([rng.randrange(1, _PRIME) for _ in range(num_perm)], dtype=np.uint64)[:, None]
+        self._b = np.array([rng.randrange(0, _PRIME) for _ in range(num_perm)], dtype=np.uint64)[:, None]
+        self._bands = bands
+        self._rows = num_perm // bands
+        self._buckets: List[Dict[bytes, List[int]]] = [{} for _ in range(bands)]
+
+    def _signatures(self, shingle_sets: Sequence[Set[str]]) -> np.ndarray:
+        """MinHash signatures of many (non-empty) sets at once: shape ``(num_perm, len(shingle_sets))``."""
+        sizes = np.fromiter((len(s) for s in shingle_sets), dtype=np.int64, count=len(shingle_sets))
+        hashes = np.fromiter(
+            (zlib.crc32(sh.encode("utf-8")) for s in shingle_sets for sh in s), dtype=np.uint64, count=int(sizes.sum())
+        )
+        permuted = (self._a * hashes + self._b) % _PRIME
+        # Minimum over each set's run of columns.
+        return np.minimum.reduceat(permuted, np.concatenate(([0], np.cumsum(sizes)[:-1])), axis=1)
+
+    def band_keys_many(self, shingle_sets: Sequence[Set[str]]) -> List[List[bytes]]:
+        sigs = np.ascontiguousarray(self._signatures(shingle_sets).T)
+        rows = self._rows
+        return [[sig[i * rows : (i + 1) * rows].tobytes() for i in range(self._bands)] for sig in sigs]
+
+    def band_keys(self, shingles: Set[str]) -> List[bytes]:
+        return self.band_keys_many([shingles])[0]
+
+    def candidates(self, keys: List[bytes]) -> Set[int]:
+        found: Set[int] = set()
+        for band, key in enumerate(keys):
+            found.update(self._buckets[band].get(key, ()))
+        return found
+
+    def add(self, keys: List[bytes], entry_id: int) -> None:
+        for band, key in enumerate(keys):
+            self._buckets[band].setdefault(key, []).append(entry_id)
+
+
+class NearDuplicateIndex:
+    """MinHash/LSH index rejecting items too similar to ones already accepted.
+
+    An item is a near-duplicate when its normalized name equals an existing one, when
+    the Jaccard similarity of its name shingles reaches ``threshold``, or when that of
+    its description + imagePrompt words reaches ``content_threshold`` for some indexed item.
+    The content table uses 2-row bands (64 permutations, 32 bands) so pairs near the
+    lower content threshold still share a bucket with high probability.
+
+    Args:
+        threshold: Name Jaccard similarity (0-1) at or above which items are duplicates.
+        content_threshold: Content Jaccard similarity (0-1) at or above which items are duplicates.
+    """
+
+    def __init__(self, threshold: float = 0.8, content_threshold: float = 0.3):
+        for value in (threshold, content_threshold):
+            if not 0 < value <= 1:
+                raise ValueError("thresholds must be in (0, 1]")
+        self.threshold = threshold
+        self.content_threshold = content_threshold
+        self._names: List[str] = []
+        self._name_shingles: List[Set[str]] = []
+        self._content_shingles: List[Set[str]] = []
+        self._exact: Dict[str, int] = {}
+        self._name_lsh = _LSHTable(num_perm=32, bands=8, seed=1)
+        self._content_lsh = _LSHTable(num_perm=64, bands=32, seed=2)
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    @classmethod
+    def from_items(cls, items: Iterable, threshold: float = 0.8, content_threshold: float = 0.3, chunk: int = 1000) -> "NearDuplicateIndex":
+        """Build an index from objects exposing ``name``, ``description`` and ``imagePrompt``.
+
+        Signatures are computed ``chunk`` items at a time in one NumPy pass, which keeps
+        rebuilding the index on ``--resume`` fast for large catalogs.
+        """
+        index = cls(threshold=threshold, content_threshold=content_threshold)
+        items = list(items)
+        for start in range(0, len(items), chunk):
+            part = items[start : start + chunk]
+            names = [name_shingles(itm.name) for itm in part]
+            contents = [content_shingles(itm.description, itm.imagePrompt) for itm in part]
+            name_keys = index._name_lsh.band_keys_many(names)
+            content_keys = index._content_lsh.band_keys_many(contents)
+            for i, itm in enumerate(part):
+                index._store(itm.name, names[i], contents[i], name_keys[i], content_keys[i])
+        return index
+
+    def add(self, name: str, description: str, image_prompt: str) -> None:
+        """Index an item unconditionally (e.g. items loaded from an existing catalog)."""
+        self._insert(name, description, image_prompt, check=False)
+
+    def add_if_novel(self, name: str, description: str, image_prompt: str) -> Optional[str]:
+        """Index the item unless it is a near-duplicate (shingles and signatures are computed once).
+
+        Returns:
+            Name of the matching indexed item, or ``None`` if the item was novel and added.
+        """
+        return self._insert(name, description, image_prompt, check=True)
+
+    def _insert(self, name: str, description: str, image_prompt: str, check: bool) -> Optional[str]:
+        norm_name = " ".join(normalize_tokens(name))
+        names = name_shingles(name)
+        content = content_shingles(description, image_prompt)
+        name_keys = self._name_lsh.band_keys(names)
+        content_keys = self._content_lsh.band_keys(content)
+        if check:
+            exact = self._exact.get(norm_name)
+            if exact is not None:
+                return self._names[exact]
+            for idx in self._name_lsh.candidates(name_keys):
+                if jaccard(names, self._name_shingles[idx]) >= self.threshold:
+                    return self._names[idx]
+            for idx in self._content_lsh.candidates(content_keys):
+                if jaccard(content, self._content_shingles[idx]) >= self.content_threshold:
+                    return self._names[idx]
+        self._store(name, names, content, name_keys, content_keys)
+        return None
+
+    def _store(self, name: str, names: Set[str], content: Set[str], name_keys: List[bytes], content_keys: List[bytes]) -> None:
+        idx = len(self._names)
+        self._names.append(name)
+        self._name_shingles.append(names)
+        self._content_shingles.append(content)
+        self._exact.setdefault(" ".join(normalize_tokens(name)), idx)
+        self._name_lsh.add(name_keys, idx)
+        self._content_lsh.add(content_keys, idx)
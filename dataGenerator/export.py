@@ -0,0 +1,106 @@
+"""Export the catalog to indexed bundles for fast downstream import.
+
+Alongside ``catalog.json`` the generator can emit:
+ - ``catalog.sqlite``: table ``catalog`` (productId primary key, indexes on
+   category and name), FTS5 table ``catalog_fts`` over description and a
+   ``meta`` table (schemaVersion, itemCount, generatedAt). Consumers can
+   ATTACH the file and bulk copy instead of parsing JSON row by row.
+ - ``catalog.parquet`` (optional, needs ``pyarrow``; install the ``export`` extra).
+
+Bundles are built in a temporary file and moved into place atomically so a
+reader never sees a half-written database.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import sqlite3
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List
+
+SCHEMA_VERSION = 1
+COLUMNS = ("productId", "name", "description", "category", "filename", "imagePrompt")
+
+_SCHEMA = """
+CREATE TABLE catalog (
+    productId TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    description TEXT NOT NULL,
+    category TEXT NOT NULL,
+    filename TEXT NOT NULL,
+    imagePrompt TEXT NOT NULL
+);
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+"""
+# Secondary indexes are created after the bulk insert, which is considerably faster.
+_INDEXES = """
+CREATE INDEX ix_catalog_category ON catalog(category);
+CREATE INDEX ix_catalog_name ON catalog(name);
+"""
+_FTS = """
+CREATE VIRTUAL TABLE catalog_fts USING fts5(description, content='catalog', content_rowid='rowid');
+INSERT INTO catalog_fts(catalog_fts) VALUES ('rebuild');
+"""
+
+
+def _tmp_path(path: Path) -> Path:
+    return path.with_name(path.name + ".tmp")
+
+
+def export_sqlite(rows: List[Dict[str, str]], path: Path) -> None:
+    """Write ``rows`` (catalog.json objects) to an indexed SQLite database at ``path``."""
+    tmp = _tmp_path(path)
+    tmp.unlink(missing_ok=True)
+    conn = sqlite3.connect(tmp)
+    try:
+        conn.execute("PRAGMA journal_mode=OFF")
+        conn.execute("PRAGMA synchronous=OFF")
+        conn.executescript(_SCHEMA)
+        with conn:
+            conn.executemany(
+                f"INSERT OR REPLACE INTO catalog ({', '.join(COLUMNS)}) VALUES ({', '.join('?' for _ in COLUMNS)})",
+                ([r.get(c) or "" for c in COLUMNS] for r in rows),
+            )
+            conn.executemany(
+                "INSERT INTO meta (key, value) VALUES (?, ?)",
+                [
+                    ("schemaVersion", str(SCHEMA_VERSION)),
+                    ("itemCount", str(len(rows))),
+                    ("generatedAt", datetime.now(timezone.utc).isoformat()),
+                ],
+            )
+        conn.executescript(_INDEXES)
+        try:
+            conn.executescript(_FTS)
+        except sqlite3.OperationalError as e:
+            logging.warning("SQLite FTS5 unavailable, exporting without full-text index: %s", e)
+        conn.execute("ANALYZE")
+    finally:
+        conn.close()
+    os.replace(tmp, path)
+
+
+def export_parquet(rows: List[Dict[str, str]], path: Path) -> bool:
+    """Write ``rows`` to a Parquet file; returns False if ``pyarrow`` is not installed."""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        logging.warning("pyarrow not installed; skipping Parquet export (install the 'export' extra)")
+        return False
+    table = pa.table({c: [r.get(c) or "" for r in rows] for c in COLUMNS})
+    tmp = _tmp_path(path)
+    pq.write_table(table, tmp)
+    os.replace(tmp, path)
+    return True
+
+
+def export_bundle(rows: List[Dict[str, str]], output_dir: Path, sqlite: bool = True, parquet: bool = False) -> None:
+    """Emit the enabled bundle formats next to ``catalog.json`` in ``output_dir``."""
+    if sqlite:
+        export_sqlite(rows, output_dir / "catalog.sqlite")
+        logging.info("SQLite bundle written with %d items", len(rows))
+    if parquet and export_parquet(rows, output_dir / "catalog.parquet"):
+        logging.info("Parquet bundle written with %d items", len(rows))
@@ -4,8 +4,14 @@ Features:
  - Generates 20 category objects (keeps only names in categories.json)
  - Iteratively generates item batches (default 20 each) until target count reached
  - Model directly returns imagePrompt (no local heuristic building)
- - Optionally generates images with concurrency controls
+ - Optionally generates images with concurrency controls, or via resumable Batch API jobs (--batch-mode)
  - Simple resume & idempotent behavior (skip existing artifacts unless forced)
+ - Local MinHash/LSH near-duplicate rejection (names, descriptions, imagePrompt) before images are requested
+ - Category-balanced batches: each request asks for specific per-category deficits against quotas
+ - Indexed SQLite (and optional Parquet) export of the final catalog for bulk downstream import
+ - Versioned changeset (added/removed/modified items + image digests) written per run for incremental import
+ - Live per-stage progress bars with moving-average ETA, optionally streamed as JSON lines (--progress-stream)
+ - Optional deterministic productIds (UUIDv5 of category + name) and per-item prompt hashes so unchanged images are skipped
 
 Environment variables (see .env.sample) control defaults; CLI flags can override.
 
@@ -19,124 +25,24 @@ Assumptions / Notes:
 from __future__ import annotations
 
 import argparse
-import asyncio
-import base64
 import json
 import logging
 from pathlib import Path
 import uuid
-from typing import List, Optional
-
-from openai import AzureOpenAI
-from pydantic import BaseModel, Field, field_validator
-from dotenv import load_dotenv
+from typing import TYPE_CHECKING, Callable, List, Optional
 import os
 
+# Heavy third-party modules (openai, pydantic via models, dotenv) and asyncio are
+# imported inside the functions that need them so --help / --status start fast.
+if TYPE_CHECKING:
+    import asyncio
 
-# ----------------------------- Pydantic Models ----------------------------- #
-
-
-class CategoryObject(BaseModel):
-    """Single category with display name and slug."""
-
-    name: str = Field(min_length=2, max_length=40)
-    slug: str = Field(min_length=2, max_length=60)
-
-
-class CategoryList(BaseModel):
-    """Wrapper root object required for structured output parsing."""
-
-    categories: List[CategoryObject]
-
-    @field_validator("categories")
-    @classmethod
-    def ensure_20_unique(cls, v: List[CategoryObject]):  # noqa: D401
-        names = [c.name.lower() for c in v]
-        if len(v) != 20:
-            raise ValueError("Expected exactly 20 categories")
-        if len(set(names)) != 20:
-            raise ValueError("Duplicate category names detected")
-        return v
-
-
-class GeneratedItem(BaseModel):
-    """Model returned by LLM for each item prior to assigning productId/filename."""
-
-    name: str = Field(min_length=3, max_length=80)
-    description: str = Field(min_length=20, max_length=1200)
-    category: str
-    imagePrompt: str = Field(min_length=30, max_length=260)
-
-    @field_validator("imagePrompt")
-    @classmethod
-    def prompt_prefix(cls, v):  # noqa: D401
-        low = v.lower()
-        if not (low.startswith("photorealistic lego-style mini") or low.startswith("photorealistic lego-style figure")):
-            raise ValueError("imagePrompt must start with required prefix")
-        forbidden = ["logo", "official", "star wars", "marvel", "dc comics", "harry potter", "ninjago"]
-        if any(tok in low for tok in forbidden):
-            raise ValueError("imagePrompt contains forbidden brand/franchise reference")
-        return v
-
-
-class GeneratedItemsWrapper(BaseModel):
-    """Root wrapper for structured batch generation."""
-
-    items: List[GeneratedItem]
-
-
-class CatalogItem(GeneratedItem):
-    productId: uuid.UUID
-    filename: str
-
-    @classmethod
-    def from_generated(cls, gen: GeneratedItem) -> "CatalogItem":
-        pid = uuid.uuid4()
-        return cls(
-            productId=pid,
-            filename=f"{pid}.png",
-            **gen.dict(),
-        )
+    from openai import AzureOpenAI
 
-
-# ----------------------------- Config Handling ----------------------------- #
-
-
-class Config(BaseModel):
-    azure_openai_endpoint: str
-    azure_openai_api_key: str
-    azure_openai_api_version: str
-    gpt_deployment: str
-    image_deployment: str
-    output_dir: Path = Field(default=Path("./data_seed"))
-    target_count: int = 200
-    batch_size: int = 20
-    image_size: int = 1024
-    parallel_image_requests: int = 4
-    max_retries: int = 5
-    dry_run: bool = False
-    log_level: str = "INFO"
-
-    @classmethod
-    def from_env(cls, overrides: dict) -> "Config":
-        env = os.environ
-        kwargs = dict(
-            azure_openai_endpoint=env.get("AZURE_OPENAI_ENDPOINT", ""),
-            azure_openai_api_key=env.get("AZURE_OPENAI_API_KEY", ""),
-            azure_openai_api_version=env.get("AZURE_OPENAI_API_VERSION", ""),
-            gpt_deployment=env.get("AZURE_OPENAI_GPT5_DEPLOYMENT", env.get("AZURE_OPENAI_GPT_DEPLOYMENT", "")),
-            image_deployment=env.get("AZURE_OPENAI_IMAGE_DEPLOYMENT", ""),
-            output_dir=Path(env.get("OUTPUT_DIR", "./data_seed")),
-            target_count=int(env.get("TARGET_COUNT", 200)),
-            batch_size=int(env.get("BATCH_SIZE", 20)),  # Force default 20 per new requirement
-            image_size=int(env.get("IMAGE_SIZE", 1024)),
-            parallel_image_requests=int(env.get("PARALLEL_IMAGE_REQUESTS", 4)),
-            max_retries=int(env.get("MAX_RETRIES", 5)),
-            dry_run=env.get("DRY_RUN", "false").lower() == "true",
-            log_level=env.get("LOG_LEVEL", "INFO"),
-        )
-        kwargs.update({k: v for k, v in overrides.items() if v is not None})
-        return cls(**kwargs)
+    from dedup import NearDuplicateIndex
+    from models import CatalogItem, Config, GeneratedItem
+    from progress import ProgressTracker
+    from scheduler import CategoryScheduler
 
 
 # ----------------------------- OpenAI Helpers ------------------------------ #
@@ -144,6 +50,8 @@ class Config(BaseModel):
 
 def azure_client(cfg: Config) -> AzureOpenAI:
     """Instantiate Azure OpenAI client."""
+    from openai import AzureOpenAI
+
     return AzureOpenAI(
         azure_endpoint=cfg.azure_openai_endpoint,
         api_key=cfg.azure_openai_api_key,
@@ -151,7 +59,27 @@ def azure_client(cfg: Config) -> AzureOpenAI:
     )
 
 
+def batch_client(cfg: Config, fallback: AzureOpenAI):
+    """Client used for ``--batch-mode`` image jobs.
+
+    Azure OpenAI Batch does not accept image-generation jobs, so when
+    ``BATCH_OPENAI_API_KEY`` is set jobs go through a plain OpenAI client
+    (optionally at ``BATCH_OPENAI_BASE_URL``); otherwise ``fallback`` is used.
+    """
+    if not cfg.batch_api_key:
+        logging.warning(
+            "BATCH_OPENAI_API_KEY not set; submitting %s batch jobs through Azure OpenAI, which may reject them",
+            cfg.batch_endpoint,
+        )
+        return fallback
+    from openai import OpenAI
+
+    return OpenAI(api_key=cfg.batch_api_key, base_url=cfg.batch_base_url)
+
+
 def generate_categories(client: AzureOpenAI, cfg: Config, force: bool) -> List[str]:
+    from models import CategoryList
+
     out_file = cfg.output_dir / "categories.json"
     if out_file.exists() and not force:
         logging.info("Using existing categories at %s", out_file)
@@ -177,17 +105,42 @@ def generate_categories(client: AzureOpenAI, cfg: Config, force: bool) -> List[s
     return names
 
 
-def generate_item_batch(client: AzureOpenAI, cfg: Config, categories: List[str], existing_names: List[str], batch_size: int) -> List[GeneratedItem]:
+def generate_item_batch(
+    client: AzureOpenAI,
+    cfg: Config,
+    categories: List[str],
+    existing_names: List[str],
+    batch_size: int,
+    dedup_index: Optional[NearDuplicateIndex] = None,
+    scheduler: Optional[CategoryScheduler] = None,
+) -> List[GeneratedItem]:
+    """Request one batch of items and keep only valid, novel ones.
+
+    Items are dropped when their category is unknown, their name matches an existing
+    one (case-insensitive) or, if ``dedup_index`` is given, when they are a near-duplicate
+    of an indexed item. Accepted items are added to ``dedup_index``.
+
+    With a ``scheduler`` the prompt asks for the scheduler's per-category deficits
+    instead of ``batch_size`` arbitrary items, and items for categories that already
+    reached their quota are dropped.
+    """
+    from models import GeneratedItemsWrapper
+
     system = (
         "You generate unique Lego-style catalog items. Return JSON object with key 'items'. Rules: "
         "Each item has name (<=6 words), description (2-4 neutral sentences, no trademarks), category (must match one of provided), "
         "imagePrompt starting EXACTLY with 'Photorealistic LEGO-style minifigure' or 'Photorealistic LEGO-style figure' followed by concise visual descriptors and 'clean background, high detail, vibrant, evenly lit, 1024x1024'. "
         "Avoid brand/franchise names, logos, real people."
     )
+    if scheduler is not None:
+        plan = scheduler.plan_batch(batch_size)
+        request_line = f"Generate new distinct items with exactly these counts per category: {json.dumps(plan)}"
+    else:
+        request_line = f"Generate {batch_size} new distinct items."
     user = (
         f"Existing categories: {json.dumps(categories)}\n"
         f"Already used names: {', '.join(existing_names) if existing_names else 'NONE'}\n"
-        f"Generate {batch_size} new distinct items."
+        f"{request_line}"
     )
     response = client.responses.parse(
         model=cfg.gpt_deployment,
@@ -206,14 +159,24 @@ def generate_item_batch(client: AzureOpenAI, cfg: Config, categories: List[str],
             continue
         if itm.category not in categories:
             continue
+        if scheduler is not None and not scheduler.has_room(itm.category):
+            logging.debug("Rejected %r: category %r already at quota", itm.name, itm.category)
+            continue
+        if dedup_index is not None:
+            match = dedup_index.add_if_novel(itm.name, itm.description, itm.imagePrompt)
+            if match is not None:
+                logging.debug("Rejected near-duplicate %r (similar to %r)", itm.name, match)
+                continue
+        if scheduler is not None:
+            scheduler.accept(itm.category)
         new_unique.append(itm)
         existing_set.add(itm.name.lower())
     return new_unique
 
 
-def save_catalog(items: List[CatalogItem], cfg: Config):
-    out_file = cfg.output_dir / "catalog.json"
-    data = [
+def catalog_rows(items: List[CatalogItem]) -> List[dict]:
+    """Serialize catalog items to the plain dicts written to catalog.json."""
+    return [
         {
             "productId": str(i.productId),
             "name": i.name,
@@ -221,25 +184,49 @@ def save_catalog(items: List[CatalogItem], cfg: Config):
             "category": i.category,
             "filename": i.filename,
             "imagePrompt": i.imagePrompt,
+            **({"promptHash": i.promptHash} if i.promptHash else {}),
         }
         for i in items
     ]
-    out_file.write_text(json.dumps(data, indent=2))
+
+
+def save_catalog(items: List[CatalogItem], cfg: Config):
+    out_file = cfg.output_dir / "catalog.json"
+    tmp = out_file.with_suffix(".json.tmp")
+    tmp.write_text(json.dumps(catalog_rows(items), indent=2))
+    os.replace(tmp, out_file)
     logging.info("Catalog saved with %d items", len(items))
 
 
-async def _generate_single_image(client: AzureOpenAI, cfg: Config, item: CatalogItem, images_dir: Path, semaphore: asyncio.Semaphore, force: bool):
+async def _generate_single_image(
+    client: AzureOpenAI,
+    cfg: Config,
+    item: CatalogItem,
+    images_dir: Path,
+    semaphore: asyncio.Semaphore,
+    force: bool,
+    progress: Optional[ProgressTracker] = None,
+) -> bool:
     """Generate a single image using the Responses API image_generation tool.
 
     The earlier approach using modalities / image params is replaced with the
     tool invocation style:
         tools=[{"type": "image_generation"}]
     and extracting base64 from outputs of type 'image_generation_call'.
+
+    Returns True if a new image file was written (``item.promptHash`` is updated then).
     """
+    import asyncio
+    import base64
+
+    from models import prompt_hash
+
     path = images_dir / item.filename
-    if path.exists() and not force:
-        return
+    if not item.needs_image(images_dir, cfg.image_size, force):
+        return False
     async with semaphore:
+        if progress:
+            progress.start("images")
         last_err: Optional[Exception] = None
         # Prefer dedicated image deployment; fall back to text deployment if not set.
         model_for_image = cfg.image_deployment or cfg.gpt_deployment
@@ -260,37 +247,71 @@ async def _generate_single_image(client: AzureOpenAI, cfg: Config, item: Catalog
                 tmp = path.with_suffix(".tmp")
                 tmp.write_bytes(binary)
                 tmp.replace(path)
-                return
+                item.promptHash = prompt_hash(prompt, cfg.image_size)
+                if progress:
+                    progress.finish("images")
+                return True
             except Exception as e:  # noqa: BLE001
                 last_err = e
+                if progress and attempt + 1 < cfg.max_retries:
+                    progress.retry("images")
                 backoff = min(2 ** attempt * 0.5, 8)
                 await asyncio.sleep(backoff)
         logging.error("Giving up generating image for %s: %s", item.productId, last_err)
+        if progress:
+            progress.finish("images", n=0, failed=1)
+        return False
+
+
+async def generate_images(
+    client: AzureOpenAI,
+    cfg: Config,
+    items: List[CatalogItem],
+    force: bool,
+    progress: Optional[ProgressTracker] = None,
+    persist: Optional[Callable[[], None]] = None,
+) -> List[str]:
+    """Generate missing (or, with ``force``, all) images; returns productIds whose image was written.
+
+    ``persist`` (e.g. saving the catalog) is called after every written image so the new
+    ``promptHash`` survives an interrupted run and the image is not paid for again.
+    """
+    import asyncio
 
-
-async def generate_images(client: AzureOpenAI, cfg: Config, items: List[CatalogItem], force: bool):
     if cfg.dry_run:
         logging.info("DRY_RUN=true -> skipping image generation")
-        return
+        return []
     images_dir = cfg.output_dir / "images"
     images_dir.mkdir(parents=True, exist_ok=True)
     semaphore = asyncio.Semaphore(cfg.parallel_image_requests)
-    tasks = [
-        _generate_single_image(client, cfg, item, images_dir, semaphore, force)
-        for item in items
-    ]
+    if progress:
+        progress.stage("images", total=sum(1 for i in items if i.needs_image(images_dir, cfg.image_size, force)))
+
+    async def _one(item: CatalogItem) -> Optional[str]:
+        written = await _generate_single_image(client, cfg, item, images_dir, semaphore, force, progress)
+        return str(item.productId) if written else None
+
+    tasks = [_one(item) for item in items]
+    written_ids: List[str] = []
     done = 0
     for coro in asyncio.as_completed(tasks):
         try:
-            await coro
+            pid = await coro
+            if pid:
+                written_ids.append(pid)
+                if persist:
+                    persist()
         except Exception as e:  # noqa: BLE001
             logging.error("Image generation failed: %s", e)
         done += 1
         if done % 10 == 0 or done == len(tasks):
             logging.info("Images progress: %d/%d", done, len(tasks))
+    return written_ids
 
 
 def load_existing_catalog(path: Path) -> List[CatalogItem]:
+    from models import CatalogItem
+
     if not path.exists():
         return []
     data = json.loads(path.read_text())
@@ -305,6 +326,7 @@ def load_existing_catalog(path: Path) -> List[CatalogItem]:
                     category=obj["category"],
                     filename=obj["filename"],
                     imagePrompt=obj.get("imagePrompt", ""),
+                    promptHash=obj.get("promptHash"),
                 )
             )
         except Exception as e:  # noqa: BLE001
@@ -313,6 +335,16 @@ def load_existing_catalog(path: Path) -> List[CatalogItem]:
 
 
 def run(cfg: Config, args):
+    import asyncio
+
+    from batch_images import generate_images_batch
+    from changeset import build_changeset, write_changeset
+    from dedup import NearDuplicateIndex
+    from export import export_bundle
+    from models import CatalogItem
+    from progress import ProgressTracker
+    from scheduler import CategoryScheduler
+
     logging.basicConfig(
         level=getattr(logging, cfg.log_level.upper(), logging.INFO),
         format="%(asctime)s %(levelname)s %(message)s",
@@ -323,27 +355,50 @@ def run(cfg: Config, args):
     categories = generate_categories(client, cfg, force=args.force_categories)
 
     catalog_path = cfg.output_dir / "catalog.json"
+    previous_rows = json.loads(catalog_path.read_text()) if catalog_path.exists() else []
+    # With deterministic IDs a regenerated item keeps its productId, so the hash of the prompt its
+    # existing image was made from carries over and unchanged images are skipped.
+    previous_hashes = {r["productId"]: r.get("promptHash") for r in previous_rows}
     items: List[CatalogItem] = []
     if args.resume and catalog_path.exists():
         items = load_existing_catalog(catalog_path)
         logging.info("Loaded %d existing items", len(items))
-
-    # Generate items until target
-    while len(items) < cfg.target_count:
+    dedup_index = NearDuplicateIndex.from_items(
+        items, threshold=cfg.dedup_threshold, content_threshold=cfg.dedup_content_threshold
+    )
+    try:
+        scheduler = CategoryScheduler(categories, cfg.target_count, cfg.category_weights)
+    except ValueError as e:
+        # categories.json is already cached, so fixing the weights and re-running costs no extra call.
+        raise SystemExit(f"Invalid CATEGORY_WEIGHTS: {e}") from None
+    scheduler.record_existing(i.category for i in items)
+    progress = ProgressTracker(stream=cfg.progress_stream)
+    progress.stage("items", total=cfg.target_count, initial=min(len(items), cfg.target_count))
+
+    # Generate items until target (or until every category quota is filled)
+    while len(items) < cfg.target_count and scheduler.remaining:
+        requested = min(cfg.batch_size, scheduler.remaining)
+        progress.start("items", requested)
         batch = generate_item_batch(
             client,
             cfg,
             categories,
             [i.name for i in items],
             cfg.batch_size,
+            dedup_index=dedup_index,
+            scheduler=scheduler,
         )
+        accepted = min(len(batch), cfg.target_count - len(items))
+        progress.finish("items", n=accepted, rejected=max(requested - accepted, 0))
         if not batch:
             logging.warning("Received empty/duplicate batch; stopping to avoid loop")
             break
-        catalog_items = [CatalogItem.from_generated(b) for b in batch]
+        catalog_items = [CatalogItem.from_generated(b, deterministic=cfg.deterministic_ids) for b in batch]
+        for ci in catalog_items:
+            ci.promptHash = previous_hashes.get(str(ci.productId))
         items.extend(catalog_items)
         save_catalog(items, cfg)
-        logging.info("Items so far: %d / %d", len(items), cfg.target_count)
+        logging.info("Items so far: %d / %d (category deficits: %s)", len(items), cfg.target_count, scheduler.deficits() or "none")
         if len(items) >= cfg.target_count:
             break
 
@@ -353,12 +408,51 @@ def run(cfg: Config, args):
         save_catalog(items, cfg)
         logging.info("Trimmed catalog to target_count=%d", cfg.target_count)
 
-    # Images
-    asyncio.run(generate_images(client, cfg, items, force=args.force_images))
-
+    # Images: entries from catalogs created before hashing adopt the current prompt's hash first.
+    adopted = sum(i.adopt_prompt_hash(cfg.output_dir / "images", cfg.image_size) for i in items)
+    if adopted:
+        logging.info("Recorded promptHash for %d existing images without one", adopted)
+    if cfg.batch_mode:
+        written_ids = generate_images_batch(
+            batch_client(cfg, client),
+            cfg,
+            items,
+            force=args.force_images,
+            progress=progress,
+            persist=lambda: save_catalog(items, cfg),
+        )
+    else:
+        written_ids = asyncio.run(
+            generate_images(client, cfg, items, force=args.force_images, progress=progress, persist=lambda: save_catalog(items, cfg))
+        )
+    progress.close()
+    save_catalog(items, cfg)
+
+    rows = catalog_rows(items)
+    export_bundle(rows, cfg.output_dir, sqlite=cfg.export_sqlite, parquet=cfg.export_parquet)
+    changes = build_changeset(previous_rows, rows, cfg.output_dir / "images", touched_ids=written_ids)
+    changeset_path = write_changeset(changes, cfg.output_dir / "changesets")
+    if changeset_path:
+        logging.info("Changeset written: %s (%s)", changeset_path, changes["counts"])
     logging.info("Generation complete")
 
 
+def print_status(output_dir: Path) -> None:
+    """Print catalog and image counts for ``output_dir`` (local files only, no network)."""
+    catalog_path = output_dir / "catalog.json"
+    items = json.loads(catalog_path.read_text()) if catalog_path.exists() else []
+    images_dir = output_dir / "images"
+    present = {p.name for p in images_dir.glob("*.png")} if images_dir.exists() else set()
+    missing = sum(1 for i in items if i.get("filename") not in present)
+    print(f"Output dir: {output_dir}")
+    print(f"Catalog items: {len(items)} | Images present: {len(items) - missing} | Missing images: {missing}")
+    per_category: dict = {}
+    for i in items:
+        per_category[i.get("category")] = per_category.get(i.get("category"), 0) + 1
+    for category, count in sorted(per_category.items(), key=lambda kv: str(kv[0])):
+        print(f"  {category}: {count}")
+
+
 def build_arg_parser() -> argparse.ArgumentParser:
     p = argparse.ArgumentParser(description="Lego catalog data generator")
     p.add_argument("--target-count", type=int, dest="target_count")
@@ -367,19 +461,47 @@ def build_arg_parser() -> argparse.ArgumentParser:
     p.add_argument("--force-images", action="store_true")
     p.add_argument("--resume", action="store_true")
     p.add_argument("--dry-run", action="store_true")
+    p.add_argument("--batch-mode", action="store_true", help="Generate images through checkpointed Batch API jobs instead of per-item calls.")
+    p.add_argument("--deterministic-ids", action="store_true", help="Derive productId as UUIDv5 of category + normalized name (stable across regenerations).")
+    p.add_argument("--progress-stream", dest="progress_stream", help="Also write JSON-lines progress to a file path or tcp://host:port.")
+    p.add_argument("--export-parquet", action="store_true", help="Also write catalog.parquet (requires pyarrow).")
+    p.add_argument("--status", action="store_true", help="Print catalog/image counts for OUTPUT_DIR and exit (no API calls).")
     return p
 
 
 def cli(argv: Optional[List[str]] = None):  # Entry point
-    load_dotenv()
     parser = build_arg_parser()
     args = parser.parse_args(argv)
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    if args.status:
+        print_status(Path(os.environ.get("OUTPUT_DIR", "./data_seed")))
+        return
+    from models import Config
+
     overrides = {
         "target_count": args.target_count,
         "batch_size": args.batch_size,
         "dry_run": args.dry_run or None,
+        "export_parquet": args.export_parquet or None,
+        "batch_mode": args.batch_mode or None,
+        "progress_stream": args.progress_stream,
+        "deterministic_ids": args.deterministic_ids or None,
     }
-    cfg = Config.from_env(overrides)
+    try:
+        cfg = Config.from_env(overrides)
+    except ValueError as e:  # includes pydantic.ValidationError
+        parser.error(f"invalid configuration: {e}")
+    categories_file = cfg.output_dir / "categories.json"
+    if cfg.category_weights and categories_file.exists() and not args.force_categories:
+        # Validate weights against cached categories before any client is created.
+        from scheduler import compute_quotas
+
+        try:
+            compute_quotas(json.loads(categories_file.read_text()), cfg.target_count, cfg.category_weights)
+        except ValueError as e:
+            parser.error(f"invalid configuration: {e}")
     run(cfg, args)
 
 
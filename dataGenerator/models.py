@@ -0,0 +1,210 @@
+"""Pydantic models and configuration for the catalog data generator.
+
+Kept separate from ``main`` so that importing the CLI module (``--help``,
+``--status``) does not pay for importing Pydantic.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import uuid
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from pydantic import BaseModel, Field, field_validator
+
+
+# ----------------------------- Pydantic Models ----------------------------- #
+
+
+class CategoryObject(BaseModel):
+    """Single category with display name and slug."""
+
+    name: str = Field(min_length=2, max_length=40)
+    slug: str = Field(min_length=2, max_length=60)
+
+
+class CategoryList(BaseModel):
+    """Wrapper root object required for structured output parsing."""
+
+    categories: List[CategoryObject]
+
+    @field_validator("categories")
+    @classmethod
+    def ensure_20_unique(cls, v: List[CategoryObject]):  # noqa: D401
+        names = [c.name.lower() for c in v]
+        if len(v) != 20:
+            raise ValueError("Expected exactly 20 categories")
+        if len(set(names)) != 20:
+            raise ValueError("Duplicate category names detected")
+        return v
+
+
+class GeneratedItem(BaseModel):
+    """Model returned by LLM for each item prior to assigning productId/filename."""
+
+    name: str = Field(min_length=3, max_length=80)
+    description: str = Field(min_length=20, max_length=1200)
+    category: str
+    imagePrompt: str = Field(min_length=30, max_length=260)
+
+    @field_validator("imagePrompt")
+    @classmethod
+    def prompt_prefix(cls, v):  # noqa: D401
+        low = v.lower()
+        if not (low.startswith("photorealistic lego-style mini") or low.startswith("photorealistic lego-style figure")):
+            raise ValueError("imagePrompt must start with required prefix")
+        forbidden = ["logo", "official", "star wars", "marvel", "dc comics", "harry potter", "ninjago"]
+        if any(tok in low for tok in forbidden):
+            raise ValueError("imagePrompt contains forbidden brand/franchise reference")
+        return v
+
+
+class GeneratedItemsWrapper(BaseModel):
+    """Root wrapper for structured batch generation."""
+
+    items: List[GeneratedItem]
+
+
+# Fixed namespace so deterministic productIds are stable across runs and machines.
+PRODUCT_ID_NAMESPACE = uuid.uuid5(uuid.NAMESPACE_URL, "https://github.com/tkubica12/MicroHack-AppInnovation/dataGenerator")
+
+
+def deterministic_product_id(category: str, name: str) -> uuid.UUID:
+    """UUIDv5 from category + normalized name (case-folded, whitespace collapsed)."""
+    key = f"{' '.join(category.casefold().split())}|{' '.join(name.casefold().split())}"
+    return uuid.uuid5(PRODUCT_ID_NAMESPACE, key)
+
+
+def prompt_hash(image_prompt: str, image_size: int) -> str:
+    """SHA-256 over the fields that determine the generated image."""
+    return hashlib.sha256(f"{image_size}\n{image_prompt}".encode("utf-8")).hexdigest()
+
+
+class CatalogItem(GeneratedItem):
+    productId: uuid.UUID
+    filename: str
+    # Hash of the prompt the current image file was generated from (None = unknown / no image yet).
+    promptHash: Optional[str] = None
+
+    @classmethod
+    def from_generated(cls, gen: GeneratedItem, deterministic: bool = False) -> "CatalogItem":
+        pid = deterministic_product_id(gen.category, gen.name) if deterministic else uuid.uuid4()
+        return cls(
+            productId=pid,
+            filename=f"{pid}.png",
+            **gen.dict(),
+        )
+
+    def needs_image(self, images_dir: Path, image_size: int, force: bool) -> bool:
+        """Whether the image must be (re)generated: forced, missing, or made from a different prompt.
+
+        An existing image without a recorded ``promptHash`` counts as up to date
+        (see :meth:`adopt_prompt_hash`).
+        """
+        if force or not (images_dir / self.filename).exists():
+            return True
+        return self.promptHash is not None and self.promptHash != prompt_hash(self.imagePrompt, image_size)
+
+    def adopt_prompt_hash(self, images_dir: Path, image_size: int) -> bool:
+        """Record the current prompt's hash for an existing image that has none (catalogs from before hashing).
+
+        Returns True if a hash was adopted.
+        """
+        if self.promptHash is not None or not (images_dir / self.filename).exists():
+            return False
+        self.promptHash = prompt_hash(self.imagePrompt, image_size)
+        return True
+
+
+# ----------------------------- Config Handling ----------------------------- #
+
+
+def parse_category_weights(raw: str) -> Dict[str, float]:
+    """Parse ``CATEGORY_WEIGHTS`` (JSON object of category name -> non-negative number)."""
+    if not raw.strip():
+        return {}
+    try:
+        weights = json.loads(raw)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"CATEGORY_WEIGHTS is not valid JSON ({e.msg} at char {e.pos}): {raw!r}") from None
+    if not isinstance(weights, dict):
+        raise ValueError(f'CATEGORY_WEIGHTS must be a JSON object like {{"Space Explorers": 2}}, got {raw!r}')
+    for name, weight in weights.items():
+        if isinstance(weight, bool) or not isinstance(weight, (int, float)) or weight < 0:
+            raise ValueError(f"CATEGORY_WEIGHTS[{name!r}] must be a non-negative number, got {weight!r}")
+    return {name: float(weight) for name, weight in weights.items()}
+
+
+class Config(BaseModel):
+    azure_openai_endpoint: str
+    azure_openai_api_key: str
+    azure_openai_api_version: str
+    gpt_deployment: str
+    image_deployment: str
+    output_dir: Path = Field(default=Path("./data_seed"))
+    target_count: int = 200
+    batch_size: int = 20
+    image_size: int = 1024
+    parallel_image_requests: int = 4
+    max_retries: int = 5
+    dedup_threshold: float = Field(default=0.8, gt=0, le=1)
+    dedup_content_threshold: float = Field(default=0.3, gt=0, le=1)
+    category_weights: Dict[str, float] = Field(default_factory=dict)
+    export_sqlite: bool = True
+    export_parquet: bool = False
+    batch_mode: bool = False
+    batch_endpoint: str = "/v1/images/generations"
+    batch_max_requests: int = 500
+    batch_poll_seconds: float = 30.0
+    batch_api_key: Optional[str] = None
+    batch_base_url: Optional[str] = None
+    progress_stream: Optional[str] = None
+    deterministic_ids: bool = False
+    dry_run: bool = False
+    log_level: str = "INFO"
+
+    @field_validator("progress_stream")
+    @classmethod
+    def valid_progress_stream(cls, v: Optional[str]):  # noqa: D401
+        if v and v.startswith("tcp://"):
+            from progress import ProgressTracker
+
+            ProgressTracker.parse_tcp_target(v)
+        return v
+
+    @classmethod
+    def from_env(cls, overrides: dict) -> "Config":
+        env = os.environ
+        kwargs = dict(
+            azure_openai_endpoint=env.get("AZURE_OPENAI_ENDPOINT", ""),
+            azure_openai_api_key=env.get("AZURE_OPENAI_API_KEY", ""),
+            azure_openai_api_version=env.get("AZURE_OPENAI_API_VERSION", ""),
+            gpt_deployment=env.get("AZURE_OPENAI_GPT5_DEPLOYMENT", env.get("AZURE_OPENAI_GPT_DEPLOYMENT", "")),
+            image_deployment=env.get("AZURE_OPENAI_IMAGE_DEPLOYMENT", ""),
+            output_dir=Path(env.get("OUTPUT_DIR", "./data_seed")),
+            target_count=int(env.get("TARGET_COUNT", 200)),
+            batch_size=int(env.get("BATCH_SIZE", 20)),  # Force default 20 per new requirement
+            image_size=int(env.get("IMAGE_SIZE", 1024)),
+            parallel_image_requests=int(env.get("PARALLEL_IMAGE_REQUESTS", 4)),
+            max_retries=int(env.get("MAX_RETRIES", 5)),
+            dedup_threshold=float(env.get("DEDUP_THRESHOLD", 0.8)),
+            dedup_content_threshold=float(env.get("DEDUP_CONTENT_THRESHOLD", 0.3)),
+            category_weights=parse_category_weights(env.get("CATEGORY_WEIGHTS", "")),
+            export_sqlite=env.get("EXPORT_SQLITE", "true").lower() == "true",
+            export_parquet=env.get("EXPORT_PARQUET", "false").lower() == "true",
+            batch_mode=env.get("BATCH_MODE", "false").lower() == "true",
+            batch_endpoint=env.get("BATCH_ENDPOINT", "/v1/images/generations"),
+            batch_max_requests=int(env.get("BATCH_MAX_REQUESTS", 500)),
+            batch_poll_seconds=float(env.get("BATCH_POLL_SECONDS", 30)),
+            batch_api_key=env.get("BATCH_OPENAI_API_KEY") or None,
+            batch_base_url=env.get("BATCH_OPENAI_BASE_URL") or None,
+            progress_stream=env.get("PROGRESS_STREAM") or None,
+            deterministic_ids=env.get("DETERMINISTIC_IDS", "false").lower() == "true",
+            dry_run=env.get("DRY_RUN", "false").lower() == "true",
+            log_level=env.get("LOG_LEVEL", "INFO"),
+        )
+        kwargs.update({k: v for k, v in overrides.items() if v is not None})
+        return cls(**kwargs)
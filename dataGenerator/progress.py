@@ -0,0 +1,211 @@
+"""Live progress reporting for long generation runs.
+
+``ProgressTracker`` keeps per-stage counters (done, in flight, retries, errors),
+a moving-average throughput over the most recent completions and an ETA
+derived from it. It renders one ``tqdm`` bar per stage (auto-disabled when
+stderr is not a terminal) and can mirror every update as JSON lines to a file
+or a local TCP socket so an orchestrator can watch the run without parsing logs:
+
+```json
+{"ts": 1760871234.5, "stage": "images", "total": 200, "done": 57, "inFlight": 4,
+ "retries": 3, "errors": 1, "rejected": 0, "rate": 0.82, "eta": 174.4, "final": false}
+```
+
+``stream`` is either a file path (appended to) or ``tcp://host:port``.
+
+While bars are enabled, logging output is routed through ``tqdm.write`` so log
+lines print above the bars instead of breaking them.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import socket
+import time
+from collections import deque
+from contextlib import ExitStack
+from pathlib import Path
+from typing import Deque, Dict, Optional, Tuple
+
+# tqdm's own remaining-time estimate is replaced by the moving-average ETA in the postfix.
+_BAR_FORMAT = "{desc}: {percentage:3.0f}%|{bar}| {n_fmt}/{total_fmt} [{elapsed}, {rate_fmt}{postfix}]"
+
+
+class StageProgress:
+    """Counters and moving-average throughput for one stage (e.g. ``items``, ``images``)."""
+
+    def __init__(self, name: str, total: int, window: int, initial: int = 0):
+        self.name = name
+        self.total = total
+        self.done = initial
+        self.in_flight = 0
+        self.retries = 0
+        self.errors = 0
+        self.rejected = 0
+        self.started = time.monotonic()
+        # (timestamp, cumulative done) samples; throughput = slope across the window.
+        self._samples: Deque[Tuple[float, int]] = deque([(self.started, initial)], maxlen=window + 1)
+
+    def record(self, n: int) -> None:
+        self.done += n
+        self._samples.append((time.monotonic(), self.done))
+
+    @property
+    def rate(self) -> Optional[float]:
+        """Completions per second over the recent window (None until measurable)."""
+        (t0, d0), (t1, d1) = self._samples[0], self._samples[-1]
+        if d1 <= d0 or t1 <= t0:
+            return None
+        return (d1 - d0) / (t1 - t0)
+
+    @property
+    def eta(self) -> Optional[float]:
+        """Seconds until ``total`` at the current rate (None if unknown); errored units count as finished."""
+        remaining = max(self.total - self.done - self.errors, 0)
+        if remaining == 0:
+            return 0.0
+        rate = self.rate
+        return remaining / rate if rate else None
+
+    def snapshot(self) -> dict:
+        rate, eta = self.rate, self.eta
+        return {
+            "stage": self.name,
+            "total": self.total,
+            "done": self.done,
+            "inFlight": self.in_flight,
+            "retries": self.retries,
+            "errors": self.errors,
+            "rejected": self.rejected,
+            "rate": round(rate, 4) if rate is not None else None,
+            "eta": round(eta, 1) if eta is not None else None,
+        }
+
+
+class ProgressTracker:
+    """Per-stage progress bars plus optional machine-readable JSON-lines stream.
+
+    Args:
+        stream: File path or ``tcp://host:port`` receiving JSON lines; ``None`` disables it.
+        bars: Render tqdm bars (still auto-disabled when not attached to a terminal).
+        window: Number of recent completions used for the moving-average rate.
+        min_interval: Minimum seconds between streamed updates per stage (final updates always go out).
+    """
+
+    def __init__(self, stream: Optional[str] = None, bars: bool = True, window: int = 20, min_interval: float = 0.5):
+        self.stages: Dict[str, StageProgress] = {}
+        self._bars: Dict[str, object] = {}
+        self._bars_enabled = bars
+        self._window = window
+        self._min_interval = min_interval
+        self._last_emit: Dict[str, float] = {}
+        self._file = None
+        self._sock: Optional[socket.socket] = None
+        self._log_redirect = ExitStack()
+        if bars:
+            from tqdm.contrib.logging import logging_redirect_tqdm
+
+            self._log_redirect.enter_context(logging_redirect_tqdm())
+        if stream:
+            self._open_stream(stream)
+
+    @staticmethod
+    def parse_tcp_target(stream: str) -> Tuple[str, int]:
+        """Split ``tcp://host:port`` into ``(host, port)``; raises ValueError if malformed."""
+        host, sep, port = stream[len("tcp://") :].rpartition(":")
+        if not sep or not port.isdigit() or not 0 < int(port) < 65536:
+            raise ValueError(f"progress stream {stream!r} must look like tcp://host:port")
+        return host or "127.0.0.1", int(port)
+
+    def _open_stream(self, stream: str) -> None:
+        try:
+            if stream.startswith("tcp://"):
+                self._sock = socket.create_connection(self.parse_tcp_target(stream), timeout=2)
+            else:
+                self._file = Path(stream).open("a", encoding="utf-8")
+        except (OSError, ValueError) as e:
+            logging.warning("Progress stream %s unavailable: %s", stream, e)
+
+    # ----------------------------- Stage updates ----------------------------- #
+
+    def stage(self, name: str, total: int, initial: int = 0) -> StageProgress:
+        """Start (or reset) a stage with ``total`` units, ``initial`` of which are already done."""
+        st = StageProgress(name, total, self._window, initial)
+        self.stages[name] = st
+        if self._bars_enabled:
+            from tqdm import tqdm
+
+            if name in self._bars:
+                self._bars[name].close()
+            self._bars[name] = tqdm(total=total, initial=initial, desc=name, unit="it", position=len(self._bars), leave=True, disable=None, bar_format=_BAR_FORMAT)
+        self._update(st, force=True)
+        return st
+
+    def start(self, name: str, n: int = 1) -> None:
+        """Mark ``n`` units as in flight."""
+        st = self.stages[name]
+        st.in_flight += n
+        self._update(st)
+
+    def finish(self, name: str, n: int = 1, failed: int = 0, rejected: int = 0) -> None:
+        """Complete in-flight units: ``n`` succeeded, ``failed`` errored, ``rejected`` were discarded (e.g. duplicates)."""
+        st = self.stages[name]
+        st.in_flight = max(st.in_flight - n - failed - rejected, 0)
+        st.errors += failed
+        st.rejected += rejected
+        st.record(n)
+        bar = self._bars.get(name)
+        if bar is not None:
+            bar.update(n)
+        self._update(st)
+
+    def retry(self, name: str) -> None:
+        st = self.stages[name]
+        st.retries += 1
+        self._update(st)
+
+    def close(self) -> None:
+        """Emit final snapshots and release bars / stream handles."""
+        for st in self.stages.values():
+            self._update(st, force=True, final=True)
+        for bar in self._bars.values():
+            bar.close()
+        self._bars.clear()
+        self._log_redirect.close()
+        self._close_stream()
+
+    def _close_stream(self) -> None:
+        for handle in (self._file, self._sock):
+            if handle is not None:
+                try:
+                    handle.close()
+                except OSError:
+                    pass
+        self._file = self._sock = None
+
+    # ----------------------------- Output ------------------------------------ #
+
+    def _update(self, st: StageProgress, force: bool = False, final: bool = False) -> None:
+        bar = self._bars.get(st.name)
+        if bar is not None:
+            eta = st.eta
+            bar.set_postfix(inflight=st.in_flight, retries=st.retries, errors=st.errors, rejected=st.rejected, eta=f"{eta:.0f}s" if eta is not None else "?", refresh=False)
+            bar.refresh()
+        now = time.monotonic()
+        if not force and now - self._last_emit.get(st.name, 0.0) < self._min_interval:
+            return
+        self._last_emit[st.name] = now
+        self._emit({"ts": round(time.time(), 3), **st.snapshot(), "final": final})
+
+    def _emit(self, event: dict) -> None:
+        line = json.dumps(event) + "\n"
+        try:
+            if self._file:
+                self._file.write(line)
+                self._file.flush()
+            if self._sock:
+                self._sock.sendall(line.encode("utf-8"))
+        except OSError as e:
+            logging.warning("Progress stream write failed, disabling: %s", e)
+            self._close_stream()
@@ -1,21 +1,34 @@
-"""Utility script to detect catalog entries whose image files are missing.
+"""Utility script to detect, repair or prune catalog entries whose image files are missing or corrupt.
 
 Usage (from dataGenerator directory):
   uv run python prune_missing_images.py --check
+  uv run python prune_missing_images.py --check --verify
+  uv run python prune_missing_images.py --repair
   uv run python prune_missing_images.py --prune
 
 It reads ../data/catalog.json and ../data/images/*.png
-If --prune is specified, it writes a backup catalog.json.bak then rewrites catalog.json without missing-image entries.
+If --verify or --repair is specified, present images are also validated (PNG signature, chunk CRCs, IEND) in parallel worker processes.
+If --repair is specified, missing/corrupt images are regenerated from each entry's stored imagePrompt through the
+generator's concurrent image path (one API call per broken image; Azure OpenAI settings from .env), and the rewritten
+images are recorded as a changeset.
+If --prune is specified, it writes a backup catalog.json.bak then rewrites catalog.json without missing-image entries
+and records the removals as a changeset in ../data/changesets (same format as generator runs, see changeset.py).
 """
 from __future__ import annotations
 import argparse
 import json
+import os
+import zlib
 from pathlib import Path
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 
 DATA_DIR = Path(__file__).resolve().parent.parent / "data"
 CATALOG_PATH = DATA_DIR / "catalog.json"
 IMAGES_DIR = DATA_DIR / "images"
+SQLITE_PATH = DATA_DIR / "catalog.sqlite"
+PARQUET_PATH = DATA_DIR / "catalog.parquet"
+CHANGESETS_DIR = DATA_DIR / "changesets"
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
 
 
 def load_catalog() -> List[dict]:
@@ -35,6 +48,86 @@ def find_missing(catalog: List[dict]) -> Tuple[List[dict], List[dict]]:
     return present, missing
 
 
+def verify_png(path: Path) -> Optional[str]:
+    """Return ``None`` if ``path`` is a structurally valid PNG, otherwise the reason it is not."""
+    try:
+        data = memoryview(path.read_bytes())
+    except OSError as e:
+        return str(e)
+    if data[:8] != PNG_SIGNATURE:
+        return "bad PNG signature"
+    pos = 8
+    while pos + 12 <= len(data):
+        length = int.from_bytes(data[pos : pos + 4], "big")
+        tag = bytes(data[pos + 4 : pos + 8])
+        end = pos + 12 + length
+        if end > len(data):
+            return f"truncated {tag.decode(errors='replace')} chunk"
+        if zlib.crc32(data[pos + 4 : end - 4]) != int.from_bytes(data[end - 4 : end], "big"):
+            return f"CRC mismatch in {tag.decode(errors='replace')} chunk"
+        if tag == b"IEND":
+            return None
+        pos = end
+    return "missing IEND chunk"
+
+
+def find_corrupt(present: List[dict], workers: int) -> List[Tuple[dict, str]]:
+    """Validate present images in parallel; returns (entry, reason) for each corrupt one."""
+    paths = [IMAGES_DIR / item["filename"] for item in present]
+    if workers <= 1 or len(paths) < 2:
+        reasons = [verify_png(p) for p in paths]
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            reasons = list(pool.map(verify_png, paths, chunksize=max(1, len(paths) // (workers * 4))))
+    return [(item, reason) for item, reason in zip(present, reasons) if reason]
+
+
+def repair_images(catalog: List[dict], broken: List[dict]) -> List[dict]:
+    """Regenerate images for ``broken`` entries via the generator; returns the updated catalog rows.
+
+    Uses ``main.generate_images`` (semaphore-bounded concurrency, retries) with ``force`` so
+    corrupt files are replaced; each image is written to a temp file and renamed into place.
+    """
+    import asyncio
+    import logging
+
+    from dotenv import load_dotenv
+
+    from changeset import build_changeset, write_changeset
+    from main import azure_client, generate_images, load_existing_catalog
+    from models import Config
+    from progress import ProgressTracker
+
+    load_dotenv()
+    # Repair is an explicit request to call the image API, so DRY_RUN from .env does not apply.
+    if os.environ.get("DRY_RUN", "false").lower() == "true":
+        print("DRY_RUN=true ignored for --repair.")
+    cfg = Config.from_env({"output_dir": DATA_DIR, "dry_run": False})
+    logging.basicConfig(level=getattr(logging, cfg.log_level.upper(), logging.INFO), format="%(asctime)s %(levelname)s %(message)s")
+    broken_ids = {b["productId"] for b in broken}
+    items = [i for i in load_existing_catalog(CATALOG_PATH) if str(i.productId) in broken_ids and i.imagePrompt]
+    if len(items) < len(broken_ids):
+        print(f"Skipping {len(broken_ids) - len(items)} entries without a usable imagePrompt.")
+    if not items:
+        return catalog
+    progress = ProgressTracker(stream=cfg.progress_stream)
+    written = asyncio.run(generate_images(azure_client(cfg), cfg, items, force=True, progress=progress))
+    progress.close()
+    print(f"Repaired {len(written)}/{len(items)} images.")
+    hashes = {str(i.productId): i.promptHash for i in items if str(i.productId) in written}
+    updated = [{**row, "promptHash": hashes[row["productId"]]} if row["productId"] in hashes else row for row in catalog]
+    if updated != catalog:
+        tmp = CATALOG_PATH.with_suffix(".json.tmp")
+        tmp.write_text(json.dumps(updated, indent=2), encoding="utf-8")
+        os.replace(tmp, CATALOG_PATH)
+    changeset_path = write_changeset(build_changeset(catalog, updated, IMAGES_DIR, touched_ids=written, source="repair"), CHANGESETS_DIR)
+    if changeset_path:
+        print(f"Changeset written: {changeset_path}")
+    return updated
+
+
 def prune_catalog(present: List[dict], missing: List[dict]) -> None:
     if not missing:
         print("No missing images. Nothing to prune.")
@@ -43,14 +136,31 @@ def prune_catalog(present: List[dict], missing: List[dict]) -> None:
     if not backup.exists():
         backup.write_text(CATALOG_PATH.read_text(encoding="utf-8"), encoding="utf-8")
         print(f"Backup written: {backup}")
-    CATALOG_PATH.write_text(json.dumps(present, indent=2), encoding="utf-8")
+    previous = present + missing
+    tmp = CATALOG_PATH.with_suffix(".json.tmp")
+    tmp.write_text(json.dumps(present, indent=2), encoding="utf-8")
+    os.replace(tmp, CATALOG_PATH)
     print(f"Pruned catalog written. Removed {len(missing)} entries. New total: {len(present)}")
+    from changeset import build_changeset, write_changeset
+
+    changeset_path = write_changeset(build_changeset(previous, present, IMAGES_DIR, source="prune"), CHANGESETS_DIR)
+    if changeset_path:
+        print(f"Changeset written: {changeset_path}")
+    # Refresh whichever bundles a generator run produced so they never go stale relative to catalog.json.
+    if SQLITE_PATH.exists() or PARQUET_PATH.exists():
+        from export import export_bundle
+
+        export_bundle(present, DATA_DIR, sqlite=SQLITE_PATH.exists(), parquet=PARQUET_PATH.exists())
+        print(f"Refreshed bundles: {', '.join(str(p) for p in (SQLITE_PATH, PARQUET_PATH) if p.exists())}")
 
 
 def main():
-    parser = argparse.ArgumentParser(description="Detect and optionally prune catalog entries with missing images.")
+    parser = argparse.ArgumentParser(description="Detect, repair or prune catalog entries with missing or corrupt images.")
     parser.add_argument("--prune", action="store_true", help="Remove entries with missing images from catalog.json (creates backup once).")
     parser.add_argument("--check", action="store_true", help="Only check and list missing (default if neither flag provided).")
+    parser.add_argument("--verify", action="store_true", help="Also validate present PNGs (signature, chunk CRCs) in parallel.")
+    parser.add_argument("--repair", action="store_true", help="Regenerate missing/corrupt images from stored imagePrompt (implies --verify).")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Worker processes for --verify/--repair (default: CPU count).")
     args = parser.parse_args()
 
     catalog = load_catalog()
@@ -63,6 +173,23 @@ def main():
     else:
         print("All catalog entries have images.")
 
+    corrupt: List[Tuple[dict, str]] = []
+    if args.verify or args.repair:
+        corrupt = find_corrupt(present, args.workers)
+        print(f"Corrupt images: {len(corrupt)}")
+        for item, reason in corrupt:
+            print(f"  {item['filename']}  ({reason})")
+
+    if args.repair:
+        broken = missing + [item for item, _ in corrupt]
+        if broken:
+            # Continue (e.g. with --prune) from the rows repair wrote, so new promptHashes survive
+            # and the next changeset's baseDigest matches the repair changeset's targetDigest.
+            catalog = repair_images(catalog, broken)
+        else:
+            print("Nothing to repair.")
+        present, missing = find_missing(catalog)
+
     if args.prune:
         prune_catalog(present, missing)
     # If neither --check nor --prune specified, default is just check (already printed)
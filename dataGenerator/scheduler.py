@@ -0,0 +1,91 @@
+"""Category-balanced scheduling of item generation batches.
+
+Instead of asking the model for ``batch_size`` items across all categories and
+accepting whatever comes back, the scheduler keeps per-category counts against
+quotas derived from ``target_count`` (uniform, or weighted via config) and tells
+each batch exactly which category deficits to fill. Items for categories that
+already reached their quota are rejected.
+"""
+
+from __future__ import annotations
+
+import logging
+import math
+from typing import Dict, Iterable, List, Optional
+
+
+def compute_quotas(categories: List[str], target_count: int, weights: Optional[Dict[str, float]] = None) -> Dict[str, int]:
+    """Split ``target_count`` across categories proportionally to ``weights``.
+
+    Categories missing from ``weights`` get weight 1. Uses the largest remainder
+    method so quotas always sum to ``target_count``; ties go to earlier categories.
+    """
+    weights = weights or {}
+    unknown = sorted(set(weights) - set(categories))
+    if unknown:
+        logging.warning("CATEGORY_WEIGHTS keys not matching any category (ignored): %s", ", ".join(unknown))
+    w = [max(float(weights.get(c, 1.0)), 0.0) for c in categories]
+    total = sum(w)
+    if not categories or total <= 0:
+        raise ValueError("CATEGORY_WEIGHTS gives every category weight 0; at least one category needs a positive weight")
+    exact = [target_count * x / total for x in w]
+    quotas = [math.floor(x) for x in exact]
+    leftover = target_count - sum(quotas)
+    by_remainder = sorted(range(len(categories)), key=lambda i: (-(exact[i] - quotas[i]), i))
+    for i in by_remainder[:leftover]:
+        quotas[i] += 1
+    return dict(zip(categories, quotas))
+
+
+class CategoryScheduler:
+    """Tracks per-category counts against quotas and plans balanced batches.
+
+    Args:
+        categories: Allowed category names.
+        target_count: Total items wanted across all categories.
+        weights: Optional relative weight per category (default 1 each).
+    """
+
+    def __init__(self, categories: List[str], target_count: int, weights: Optional[Dict[str, float]] = None):
+        self.quotas = compute_quotas(categories, target_count, weights)
+        self.counts: Dict[str, int] = {c: 0 for c in categories}
+
+    def deficits(self) -> Dict[str, int]:
+        """Remaining items needed per category (only categories still below quota)."""
+        return {c: q - self.counts[c] for c, q in self.quotas.items() if self.counts[c] < q}
+
+    @property
+    def remaining(self) -> int:
+        """Total items still needed to fill every quota."""
+        return sum(self.deficits().values())
+
+    def plan_batch(self, batch_size: int) -> Dict[str, int]:
+        """Return how many items to request per category in the next batch.
+
+        Slots are handed out one at a time to the category with the largest
+        outstanding deficit (net of slots already planned), so a batch never asks
+        for more than a category still needs.
+        """
+        deficits = self.deficits()
+        plan: Dict[str, int] = {}
+        for _ in range(min(batch_size, sum(deficits.values()))):
+            cat = max(deficits, key=lambda c: deficits[c] - plan.get(c, 0))
+            plan[cat] = plan.get(cat, 0) + 1
+        return plan
+
+    def has_room(self, category: str) -> bool:
+        """Whether ``category`` is known and still below its quota."""
+        return category in self.quotas and self.counts[category] < self.quotas[category]
+
+    def accept(self, category: str) -> bool:
+        """Count an item for ``category`` if its quota allows; return whether accepted."""
+        if not self.has_room(category):
+            return False
+        self.counts[category] += 1
+        return True
+
+    def record_existing(self, categories: Iterable[str]) -> None:
+        """Count already accepted items (e.g. loaded on resume), ignoring quota limits."""
+        for cat in categories:
+            if cat in self.counts:
+                self.counts[cat] += 1
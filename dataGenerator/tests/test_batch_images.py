@@ -0,0 +1,151 @@
+"""Batch mode against the local FakeBatchClient: restarts, retries and --force-images."""
+
+import json
+import uuid
+
+import pytest
+
+import batch_images
+from batch_images import BatchJobStore, FakeBatchClient, generate_images_batch
+from models import CatalogItem, Config, prompt_hash
+
+
+class SimulatedCrash(Exception):
+    pass
+
+
+def make_config(tmp_path, **overrides):
+    return Config(
+        azure_openai_endpoint="https://example.invalid",
+        azure_openai_api_key="test",
+        azure_openai_api_version="test",
+        gpt_deployment="gpt",
+        image_deployment="image",
+        output_dir=tmp_path / "out",
+        batch_poll_seconds=0,
+        **overrides,
+    )
+
+
+def make_item(n, prompt_extra=""):
+    pid = uuid.uuid4()
+    return CatalogItem(
+        productId=pid,
+        filename=f"{pid}.png",
+        name=f"Test Figure {n}",
+        description="A test minifigure used by the batch mode tests.",
+        category="Testing",
+        imagePrompt=f"Photorealistic LEGO-style minifigure number {n}{prompt_extra}, clean background",
+    )
+
+
+def submitted_batches(fake_root):
+    return sorted((fake_root / "batches").glob("*.json"))
+
+
+def crash_on_first_poll(monkeypatch):
+    """Interrupt ``collect_batches`` after submission, as if the process was killed while waiting."""
+
+    def sleep(_seconds):
+        raise SimulatedCrash
+
+    monkeypatch.setattr(batch_images.time, "sleep", sleep)
+
+
+def test_restart_reattaches_to_unfinished_jobs(tmp_path, monkeypatch):
+    cfg = make_config(tmp_path)
+    items = [make_item(n) for n in range(3)]
+    fake_root = tmp_path / "fake"
+
+    crash_on_first_poll(monkeypatch)
+    with pytest.raises(SimulatedCrash):
+        generate_images_batch(FakeBatchClient(fake_root, polls_to_complete=3), cfg, items, force=False)
+    store = BatchJobStore(cfg.output_dir / "batch" / "jobs.json")
+    assert len(store.pending()) == 1
+    assert store.pending_ids() == {str(i.productId) for i in items}
+    monkeypatch.undo()
+
+    # New client instance = restarted process; same service state on disk.
+    written = generate_images_batch(FakeBatchClient(fake_root, polls_to_complete=3), cfg, items, force=False)
+
+    assert sorted(written) == sorted(str(i.productId) for i in items)
+    assert len(submitted_batches(fake_root)) == 1  # re-attached, nothing resubmitted
+    assert all((cfg.output_dir / "images" / i.filename).exists() for i in items)
+    assert BatchJobStore(cfg.output_dir / "batch" / "jobs.json").pending() == []
+
+
+def test_failed_item_is_resubmitted_on_next_run(tmp_path):
+    cfg = make_config(tmp_path)
+    ok, failing = make_item(1), make_item(2, prompt_extra=" FAIL")
+    fake_root = tmp_path / "fake"
+
+    written = generate_images_batch(FakeBatchClient(fake_root), cfg, [ok, failing], force=False)
+    assert written == [str(ok.productId)]
+    assert not (cfg.output_dir / "images" / failing.filename).exists()
+
+    written = generate_images_batch(FakeBatchClient(fake_root, fail_marker=None), cfg, [ok, failing], force=False)
+
+    assert written == [str(failing.productId)]
+    jobs = json.loads((cfg.output_dir / "batch" / "jobs.json").read_text())
+    assert [job["productIds"] for job in jobs] == [[str(ok.productId), str(failing.productId)], [str(failing.productId)]]
+
+
+def test_force_images_does_not_resubmit_in_flight_items(tmp_path, monkeypatch):
+    cfg = make_config(tmp_path)
+    items = [make_item(n) for n in range(2)]
+    fake_root = tmp_path / "fake"
+    generate_images_batch(FakeBatchClient(fake_root), cfg, items, force=False)
+    assert len(submitted_batches(fake_root)) == 1
+
+    crash_on_first_poll(monkeypatch)
+    with pytest.raises(SimulatedCrash):
+        generate_images_batch(FakeBatchClient(fake_root, polls_to_complete=2), cfg, items, force=True)
+    monkeypatch.undo()
+    assert len(submitted_batches(fake_root)) == 2
+
+    written = generate_images_batch(FakeBatchClient(fake_root, polls_to_complete=2), cfg, items, force=True)
+
+    assert sorted(written) == sorted(str(i.productId) for i in items)
+    assert len(submitted_batches(fake_root)) == 2  # the forced in-flight job was reused, not paid for again
+
+
+def test_catalog_persisted_after_each_job(tmp_path):
+    cfg = make_config(tmp_path, batch_max_requests=1)
+    items = [make_item(n) for n in range(3)]
+    snapshots = []
+
+    def persist():
+        jobs = json.loads((cfg.output_dir / "batch" / "jobs.json").read_text())
+        snapshots.append(([i.promptHash is not None for i in items], [job["processed"] for job in jobs]))
+
+    generate_images_batch(FakeBatchClient(tmp_path / "fake"), cfg, items, force=False, persist=persist)
+
+    # One save per finished job, each before that job is checkpointed as processed.
+    assert snapshots == [
+        ([True, False, False], [False, False, False]),
+        ([True, True, False], [True, False, False]),
+        ([True, True, True], [True, True, False]),
+    ]
+
+
+def test_prompt_changed_while_in_flight_is_resubmitted(tmp_path, monkeypatch):
+    cfg = make_config(tmp_path)
+    items = [make_item(n) for n in range(2)]
+    fake_root = tmp_path / "fake"
+
+    crash_on_first_poll(monkeypatch)
+    with pytest.raises(SimulatedCrash):
+        generate_images_batch(FakeBatchClient(fake_root, polls_to_complete=2), cfg, items, force=False)
+    monkeypatch.undo()
+
+    # Prompt edited between submission and restart: the old job's image must not be trusted.
+    items[1].imagePrompt += ", holding a lantern"
+    written = generate_images_batch(FakeBatchClient(fake_root, polls_to_complete=2), cfg, items, force=False)
+
+    assert sorted(written) == sorted(str(i.productId) for i in items)
+    assert len(submitted_batches(fake_root)) == 2
+    assert all(i.promptHash == prompt_hash(i.imagePrompt, cfg.image_size) for i in items)
+    jobs = json.loads((cfg.output_dir / "batch" / "jobs.json").read_text())
+    assert [job["productIds"] for job in jobs] == [[str(items[0].productId)], [str(items[1].productId)]]
+
+    assert generate_images_batch(FakeBatchClient(fake_root), cfg, items, force=False) == []
@@ -0,0 +1,29 @@
+"""changeset.build_changeset: row diffs and digests."""
+
+from changeset import build_changeset, catalog_digest
+
+
+def row(pid, prompt="prompt", **extra):
+    return {"productId": pid, "name": f"Item {pid}", "filename": f"{pid}.png", "imagePrompt": prompt, **extra}
+
+
+def test_adopted_prompt_hash_is_not_a_modification(tmp_path):
+    previous = [row("a"), row("b")]
+    current = [row("a", promptHash="h1"), row("b", promptHash="h2")]
+
+    changes = build_changeset(previous, current, tmp_path)
+
+    assert changes["counts"] == {"added": 0, "removed": 0, "modified": 0, "images": 0}
+    assert changes["baseDigest"] == changes["targetDigest"]
+
+
+def test_changed_prompt_is_modified_and_image_digested(tmp_path):
+    (tmp_path / "b.png").write_bytes(b"png")
+    previous = [row("a", promptHash="h1"), row("b", promptHash="h2")]
+    current = [row("a", promptHash="h1"), row("b", prompt="new prompt", promptHash="h3")]
+
+    changes = build_changeset(previous, current, tmp_path)
+
+    assert [r["productId"] for r in changes["modified"]] == ["b"]
+    assert list(changes["images"]) == ["b"]
+    assert changes["targetDigest"] == catalog_digest(list(reversed(current)))
@@ -0,0 +1,62 @@
+"""dedup.NearDuplicateIndex: renamed and paraphrased items are rejected, distinct ones kept."""
+
+import pytest
+
+from dedup import NearDuplicateIndex
+
+COMET = dict(
+    name="Comet Trail Navigator",
+    description="This explorer charts safe routes through debris fields. The set emphasizes careful observation and calm decision-making.",
+    image_prompt="Photorealistic LEGO-style minifigure, white and orange spacesuit with chest control panel, translucent bubble helmet, "
+    "handheld star map tablet, compact thruster pack, clean background, high detail, vibrant, evenly lit, 1024x1024",
+)
+DUST = dict(
+    name="Comet Dust Collector",
+    description="This specialist gathers particle samples from icy tails. They log findings to support propulsion research.",
+    image_prompt="Photorealistic LEGO-style minifigure in gray sampling suit with filter mask, backpack vacuum canister hose, "
+    "sample vial and tongs, clean background, high detail, vibrant, evenly lit, 1024x1024",
+)
+
+
+@pytest.fixture
+def index():
+    idx = NearDuplicateIndex()
+    assert idx.add_if_novel(**COMET) is None
+    return idx
+
+
+def test_plural_name_is_duplicate(index):
+    other = dict(DUST, name="Comet Trail Navigators")
+    assert index.add_if_novel(**other) == "Comet Trail Navigator"
+
+
+def test_paraphrase_is_duplicate(index):
+    paraphrase = dict(
+        name="Debris Field Pathfinder",
+        description="A bold space pilot that maps comet trails and plots safe paths through debris fields, staying calm and observant.",
+        image_prompt="Photorealistic LEGO-style minifigure, orange and white space suit with chest control panel, clear bubble helmet, "
+        "star map tablet in hand, small thruster pack, clean background, high detail, vibrant, evenly lit, 1024x1024",
+    )
+    assert index.add_if_novel(**paraphrase) == "Comet Trail Navigator"
+
+
+def test_distinct_item_in_same_theme_is_kept(index):
+    assert index.add_if_novel(**DUST) is None
+    assert len(index) == 2
+
+
+def test_from_items_matches_incremental_adds():
+    class Item:
+        def __init__(self, name, description, image_prompt):
+            self.name, self.description, self.imagePrompt = name, description, image_prompt
+
+    idx = NearDuplicateIndex.from_items([Item(**COMET), Item(**DUST)])
+    assert len(idx) == 2
+    assert idx.add_if_novel(**dict(DUST, name="Comet Dust Collectors")) == "Comet Dust Collector"
+
+
+def test_threshold_bounds():
+    with pytest.raises(ValueError):
+        NearDuplicateIndex(threshold=0)
+    with pytest.raises(ValueError):
+        NearDuplicateIndex(content_threshold=1.5)
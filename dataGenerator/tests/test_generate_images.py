@@ -0,0 +1,87 @@
+"""main.generate_images: prompt-hash skipping and persistence across an interrupted run."""
+
+import asyncio
+import base64
+import uuid
+
+import pytest
+
+from batch_images import tiny_png
+from main import generate_images, load_existing_catalog, save_catalog
+from models import CatalogItem, Config, prompt_hash
+
+
+class SimulatedCrash(BaseException):
+    """Not an ``Exception``, so the per-image retry loop does not swallow it (like a killed process)."""
+
+
+class CountingImagesClient:
+    """Stand-in for ``client.images.generate``; raises ``SimulatedCrash`` on call ``crash_on``."""
+
+    def __init__(self, crash_on=None):
+        self.calls = 0
+        self.crash_on = crash_on
+        self.images = self
+
+    def generate(self, model, prompt, size):
+        self.calls += 1
+        if self.calls == self.crash_on:
+            raise SimulatedCrash
+        return type("Resp", (), {"data": [type("Image", (), {"b64_json": base64.b64encode(tiny_png()).decode()})()]})()
+
+
+def make_config(tmp_path):
+    return Config(
+        azure_openai_endpoint="https://example.invalid",
+        azure_openai_api_key="test",
+        azure_openai_api_version="test",
+        gpt_deployment="gpt",
+        image_deployment="image",
+        output_dir=tmp_path,
+        parallel_image_requests=1,
+    )
+
+
+def make_item(n, prompt_hash_value=None):
+    pid = uuid.uuid4()
+    return CatalogItem(
+        productId=pid,
+        filename=f"{pid}.png",
+        name=f"Test Figure {n}",
+        description="A test minifigure used by the image generation tests.",
+        category="Testing",
+        imagePrompt=f"Photorealistic LEGO-style minifigure number {n}, clean background",
+        promptHash=prompt_hash_value,
+    )
+
+
+def test_interrupted_run_does_not_pay_twice_for_rebuilt_images(tmp_path):
+    cfg = make_config(tmp_path)
+    (tmp_path / "images").mkdir()
+    # Existing images rendered from older prompts: every item needs a rebuild.
+    items = [make_item(n, prompt_hash_value="old-prompt") for n in range(4)]
+    for item in items:
+        (tmp_path / "images" / item.filename).write_bytes(tiny_png())
+    save_catalog(items, cfg)
+
+    client = CountingImagesClient(crash_on=3)
+    with pytest.raises(SimulatedCrash):
+        asyncio.run(generate_images(client, cfg, items, force=False, persist=lambda: save_catalog(items, cfg)))
+
+    reloaded = load_existing_catalog(tmp_path / "catalog.json")
+    assert sum(i.promptHash == prompt_hash(i.imagePrompt, cfg.image_size) for i in reloaded) == 2
+    client = CountingImagesClient()
+    written = asyncio.run(generate_images(client, cfg, reloaded, force=False))
+    assert client.calls == 2
+    assert len(written) == 2
+
+
+def test_needs_image_does_not_adopt_hashes(tmp_path):
+    item = make_item(1)
+    (tmp_path / item.filename).write_bytes(tiny_png())
+
+    assert not item.needs_image(tmp_path, 1024, force=False)
+    assert item.promptHash is None
+    assert item.adopt_prompt_hash(tmp_path, 1024)
+    assert item.promptHash == prompt_hash(item.imagePrompt, 1024)
+    assert not item.adopt_prompt_hash(tmp_path, 1024)
@@ -0,0 +1,47 @@
+"""progress.ProgressTracker: stream targets, log routing and counters."""
+
+import json
+import logging
+import sys
+
+import pytest
+
+from progress import ProgressTracker
+
+
+def test_malformed_tcp_target_is_rejected_without_crashing(caplog):
+    with pytest.raises(ValueError):
+        ProgressTracker.parse_tcp_target("tcp://host")
+    with caplog.at_level(logging.WARNING):
+        tracker = ProgressTracker(stream="tcp://host", bars=False)
+    assert "unavailable" in caplog.text
+    tracker.stage("images", total=1)
+    tracker.close()
+
+
+def test_logging_goes_through_tqdm_while_bars_are_active():
+    root = logging.getLogger()
+    handler = logging.StreamHandler(sys.stderr)
+    root.addHandler(handler)
+    try:
+        tracker = ProgressTracker(bars=True)
+        assert handler not in root.handlers
+        tracker.close()
+        assert handler in root.handlers
+    finally:
+        root.removeHandler(handler)
+
+
+def test_stream_records_counters_and_final_snapshot(tmp_path):
+    out = tmp_path / "progress.jsonl"
+    tracker = ProgressTracker(stream=str(out), bars=False, min_interval=0)
+    tracker.stage("images", total=3)
+    tracker.start("images", 3)
+    tracker.retry("images")
+    tracker.finish("images", n=2, failed=1)
+    tracker.close()
+
+    events = [json.loads(line) for line in out.read_text().splitlines()]
+    final = events[-1]
+    assert final["final"] is True
+    assert (final["done"], final["errors"], final["retries"], final["inFlight"], final["eta"]) == (2, 1, 1, 0, 0.0)
@@ -0,0 +1,109 @@
+"""prune_missing_images.py: bundle refresh on --prune and --repair followed by --prune."""
+
+import base64
+import json
+import sqlite3
+import sys
+import uuid
+
+import pytest
+
+import main as generator
+import prune_missing_images as prune
+from batch_images import tiny_png
+from changeset import catalog_digest
+from export import export_bundle
+from models import prompt_hash
+
+
+class FakeImagesClient:
+    """Stand-in for ``client.images.generate`` returning a tiny PNG."""
+
+    def __init__(self):
+        self.calls = 0
+        self.images = self
+
+    def generate(self, model, prompt, size):
+        self.calls += 1
+        return type("Resp", (), {"data": [type("Image", (), {"b64_json": base64.b64encode(tiny_png()).decode()})()]})()
+
+
+def row(n, image_prompt=True):
+    pid = str(uuid.uuid4())
+    return {
+        "productId": pid,
+        "name": f"Test Figure {n}",
+        "description": "A test minifigure used by the prune tests.",
+        "category": "Testing",
+        "filename": f"{pid}.png",
+        **({"imagePrompt": f"Photorealistic LEGO-style minifigure number {n}, clean background"} if image_prompt else {}),
+    }
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    """Point the script's module-level paths at an empty data directory."""
+    (tmp_path / "images").mkdir()
+    monkeypatch.setattr(prune, "DATA_DIR", tmp_path)
+    monkeypatch.setattr(prune, "CATALOG_PATH", tmp_path / "catalog.json")
+    monkeypatch.setattr(prune, "IMAGES_DIR", tmp_path / "images")
+    monkeypatch.setattr(prune, "SQLITE_PATH", tmp_path / "catalog.sqlite")
+    monkeypatch.setattr(prune, "PARQUET_PATH", tmp_path / "catalog.parquet")
+    monkeypatch.setattr(prune, "CHANGESETS_DIR", tmp_path / "changesets")
+    return tmp_path
+
+
+def test_prune_refreshes_existing_bundles(data_dir, monkeypatch):
+    pq = pytest.importorskip("pyarrow.parquet")
+    kept, gone = row(1), row(2)
+    (data_dir / "images" / kept["filename"]).write_bytes(tiny_png())
+    (data_dir / "catalog.json").write_text(json.dumps([kept, gone]))
+    export_bundle([kept, gone], data_dir, sqlite=True, parquet=True)
+    monkeypatch.setattr(sys, "argv", ["prune_missing_images.py", "--prune"])
+
+    prune.main()
+
+    with sqlite3.connect(data_dir / "catalog.sqlite") as conn:
+        assert conn.execute("SELECT productId FROM catalog").fetchall() == [(kept["productId"],)]
+    assert pq.read_table(data_dir / "catalog.parquet").column("productId").to_pylist() == [kept["productId"]]
+
+
+def test_repair_regenerates_only_broken_images(data_dir, monkeypatch):
+    ok, missing, corrupt = row(1), row(2), row(3)
+    (data_dir / "images" / ok["filename"]).write_bytes(tiny_png())
+    (data_dir / "images" / corrupt["filename"]).write_bytes(tiny_png()[:-6])
+    (data_dir / "catalog.json").write_text(json.dumps([ok, missing, corrupt]))
+    client = FakeImagesClient()
+    monkeypatch.setattr(generator, "azure_client", lambda cfg: client)
+    monkeypatch.setenv("DRY_RUN", "true")
+    monkeypatch.setattr(sys, "argv", ["prune_missing_images.py", "--repair", "--workers", "1"])
+
+    prune.main()
+
+    assert client.calls == 2
+    assert all(prune.verify_png(data_dir / "images" / r["filename"]) is None for r in (ok, missing, corrupt))
+    (changeset,) = (json.loads(p.read_text()) for p in (data_dir / "changesets").glob("*.json"))
+    assert changeset["source"] == "repair"
+    assert sorted(changeset["images"]) == sorted([missing["productId"], corrupt["productId"]])
+
+
+def test_repair_then_prune_keeps_repaired_hashes(data_dir, monkeypatch):
+    tmp_path, images = data_dir, data_dir / "images"
+    ok, repairable, unrepairable = row(1), row(2), row(3, image_prompt=False)
+    (images / ok["filename"]).write_bytes(tiny_png())
+    (tmp_path / "catalog.json").write_text(json.dumps([ok, repairable, unrepairable]))
+
+    client = FakeImagesClient()
+    monkeypatch.setattr(generator, "azure_client", lambda cfg: client)
+    monkeypatch.setattr(sys, "argv", ["prune_missing_images.py", "--repair", "--prune", "--workers", "1"])
+
+    prune.main()
+
+    assert client.calls == 1
+    final = json.loads((tmp_path / "catalog.json").read_text())
+    assert [r["productId"] for r in final] == [ok["productId"], repairable["productId"]]
+    assert final[1]["promptHash"] == prompt_hash(repairable["imagePrompt"], 1024)
+    repair_cs, prune_cs = (json.loads(p.read_text()) for p in sorted((tmp_path / "changesets").glob("*.json")))
+    assert (repair_cs["source"], prune_cs["source"]) == ("repair", "prune")
+    assert prune_cs["baseDigest"] == repair_cs["targetDigest"]
+    assert prune_cs["targetDigest"] == catalog_digest(final)
@@ -0,0 +1,49 @@
+"""scheduler: largest-remainder quotas and deficit-first batch plans."""
+
+import logging
+
+import pytest
+
+from scheduler import CategoryScheduler, compute_quotas
+
+
+def test_uniform_quotas_sum_to_target_with_remainder_to_earlier_categories():
+    assert compute_quotas(["A", "B", "C"], 10) == {"A": 4, "B": 3, "C": 3}
+
+
+def test_weighted_quotas_use_largest_remainder():
+    # Exact shares 5.0 / 2.5 / 2.5: the tied remainders go to the earlier category.
+    assert compute_quotas(["A", "B", "C"], 10, {"A": 2}) == {"A": 5, "B": 3, "C": 2}
+    # Exact shares 1.43 / 2.86 / 5.71: largest remainders (.86, .71) win.
+    assert compute_quotas(["A", "B", "C"], 10, {"A": 1, "B": 2, "C": 4}) == {"A": 1, "B": 3, "C": 6}
+
+
+def test_zero_weight_category_gets_nothing():
+    assert compute_quotas(["A", "B"], 7, {"B": 0}) == {"A": 7, "B": 0}
+
+
+def test_all_zero_weights_rejected():
+    with pytest.raises(ValueError, match="CATEGORY_WEIGHTS"):
+        compute_quotas(["A", "B"], 10, {"A": 0, "B": 0})
+
+
+def test_unknown_weight_key_warns(caplog):
+    with caplog.at_level(logging.WARNING):
+        compute_quotas(["Space Explorers", "Pirate Crew"], 4, {"Space Explorer": 3})
+    assert "Space Explorer" in caplog.text
+
+
+def test_plan_batch_fills_largest_deficits_first():
+    scheduler = CategoryScheduler(["A", "B", "C"], 12, {"A": 2})  # quotas 6 / 3 / 3
+    scheduler.record_existing(["A", "A", "A", "A", "B"])
+    assert scheduler.deficits() == {"A": 2, "B": 2, "C": 3}
+    assert scheduler.plan_batch(4) == {"C": 2, "A": 1, "B": 1}
+    assert scheduler.plan_batch(100) == {"A": 2, "B": 2, "C": 3}
+
+
+def test_accept_respects_quota():
+    scheduler = CategoryScheduler(["A", "B"], 2)
+    assert scheduler.accept("A")
+    assert not scheduler.accept("A")
+    assert not scheduler.accept("Unknown")
+    assert scheduler.remaining == 1